@@ -0,0 +1,66 @@
+# auth.py
+# 로그인 유지: 서명된 세션 쿠키 + ID 토큰 클레임 해석 + userinfo 캐시 (Streamlit 비의존)
+import json, time, hmac, base64, hashlib, secrets, threading
+
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+SESSION_TTL = 30*24*60*60
+COOKIE = "wt_sess"
+
+def _b64decode(s: str) -> bytes:
+    return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+
+def id_token_claims(id_token: str, client_id: str, now: float = None) -> dict:
+    """
+    토큰 엔드포인트에서 TLS 로 직접 받은 ID 토큰의 클레임. 이 경우 서명 검증은 생략할 수 있고(OIDC Core 3.1.3.7)
+    aud/iss/exp 와 이메일 확인 여부만 본다. 조건에 안 맞으면 None -> userinfo 로 폴백.
+    """
+    try:
+        claims = json.loads(_b64decode(id_token.split(".")[1]))
+    except Exception:
+        return None
+    aud = claims.get("aud")
+    if client_id not in (aud if isinstance(aud, list) else [aud]): return None
+    if claims.get("iss") not in GOOGLE_ISSUERS: return None
+    if float(claims.get("exp", 0)) <= (now or time.time()): return None
+    if not claims.get("email") or claims.get("email_verified") in (False, "false"): return None
+    return claims
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(24)
+
+def sign(session_id: str, key: bytes) -> str:
+    # 쿠키는 앱(project.set_session_cookie)이 JS 로 심으므로 HttpOnly 가 아니다 (Secure 도 https 일 때만). 서명은 위조만 막고
+    # 탈취(XSS 등)는 못 막는다 - 세션 행 삭제(storage.delete_session)와 SESSION_TTL 로 피해를 줄인다.
+    mac = hmac.new(key, session_id.encode(), hashlib.sha256).digest()
+    return session_id + "." + base64.urlsafe_b64encode(mac).decode().rstrip("=")
+
+def verify(cookie: str, key: bytes):
+    """쿠키 값이 우리가 서명한 것이면 세션 id, 아니면 None."""
+    if not cookie or "." not in cookie: return None
+    sid = cookie.rsplit(".", 1)[0]
+    return sid if hmac.compare_digest(sign(sid, key), cookie) else None
+
+class UserinfoCache:
+    """access token(해시) -> userinfo. 토큰 만료 시각까지만 재사용하고 원문 토큰은 들고 있지 않는다."""
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._m = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        now = time.time()
+        with self._lock:
+            hit = self._m.get(self._key(token))
+            return hit[1] if hit and hit[0] > now else None
+
+    def put(self, token: str, info: dict, expires_in: float):
+        now = time.time()
+        with self._lock:
+            if len(self._m) >= self.max_entries:
+                self._m = {k: v for k, v in self._m.items() if v[0] > now}
+                if len(self._m) >= self.max_entries: self._m.clear()
+            self._m[self._key(token)] = (now + expires_in, info)
@@ -0,0 +1,263 @@
+# bench_app.py
+# project.py 를 Streamlit AppTest 로 헤드리스 실행하는 부하/회귀 벤치.
+#   python bench/bench_app.py [--shares 200] [--big-items 1000] [--runs 10] [--sessions 1,8,32] [--json out.json] [--compare base.json]
+# 외부 의존은 전부 로컬 대역으로 바꾼다:
+#   Supabase  -> engagement_backend="sqlite" (seed.py 가 채운 shares.db)
+#   Google    -> 세션에 로그인 사용자를 직접 넣음 (OAuth 버튼은 AppTest 에서 그려지지 않는다)
+#   쿠키       -> AppTest 의 st.context.cookies 는 가짜라서 익명 방문자 id(wt_cid)도 세션에 직접 넣음
+#   웹툰 사이트 -> bench/fixtures/*.html 을 돌려주는 로컬 HTTP 서버 (링크 워커 시나리오)
+import sys, os, io, re, json, time, argparse, tempfile, threading, subprocess, resource, statistics, tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+import seed as seeding
+
+APP_PATH = os.path.join(ROOT, "project.py")
+FIXTURES = os.path.join(HERE, "fixtures")
+
+# =========================
+# --- Stand-ins
+# =========================
+class FakeSites:
+    """fixtures 의 웹툰 페이지를 돌려주는 로컬 서버. og:image 는 같은 서버의 /cover.png 로 바꿔 치운다."""
+    def __init__(self):
+        pages = {}
+        for name in os.listdir(FIXTURES):
+            if name.endswith(".html"):
+                body = open(os.path.join(FIXTURES, name), "rb").read()
+                pages[name] = re.sub(rb'(og:image"\s+content=")[^"]*', rb"\1/cover.png", body)
+        cover = b""
+        try:
+            from PIL import Image
+            buf = io.BytesIO()
+            Image.new("RGB", (720, 1040), (200, 120, 90)).save(buf, "PNG")
+            cover = buf.getvalue()
+        except ImportError:
+            pass
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0].lstrip("/")
+                if path == "cover.png" and cover:
+                    body, ctype = cover, "image/png"
+                elif path in pages:
+                    body, ctype = pages[path], "text/html; charset=utf-8"
+                else:
+                    self.send_error(404); return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            def log_message(self, *a): pass
+
+        self.pages = sorted(pages)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+def app_test(db_path, query=None, email=None):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.secrets["google_oauth"] = {"client_id": "bench", "client_secret": "bench", "redirect_uri": "http://localhost:8501"}
+    at.secrets["app"] = {"engagement_backend": "sqlite", "db_file": db_path, "metrics": True}
+    if query: at.query_params.update(query)
+    if email: at.session_state["user"] = {"email": email, "name": "Bench", "picture": None}
+    at.session_state["__cid"] = os.urandom(8).hex()
+    return at
+
+def clear_caches():
+    import streamlit as st
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+# =========================
+# --- Measurement
+# =========================
+def run(at) -> float:
+    t0 = time.perf_counter()
+    at.run()
+    ms = (time.perf_counter() - t0) * 1000
+    if at.exception:
+        raise RuntimeError("; ".join(e.message for e in at.exception))
+    return ms
+
+def summarize(samples, **extra) -> dict:
+    s = sorted(samples)
+    return dict({
+        "runs": len(s),
+        "mean_ms": round(statistics.fmean(s), 2),
+        "p50_ms": round(s[len(s) // 2], 2),
+        "p95_ms": round(s[min(len(s) - 1, int(len(s) * 0.95))], 2),
+        "max_ms": round(s[-1], 2),
+    }, **extra)
+
+def peak_kb(at) -> float:
+    # 재실행 한 번 동안 파이썬 힙이 얼마나 늘었다 줄었는지 (tracemalloc 은 느려서 따로 한 번만)
+    tracemalloc.start()
+    try:
+        run(at)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+def elements(node) -> int:
+    # 화면 트리의 노드 수 (재실행 한 번에 프런트로 가는 델타 수와 비례)
+    kids = getattr(node, "children", None) or {}
+    return 1 + sum(elements(c) for c in kids.values())
+
+def scenario(db_path, runs, query=None, email=None, cold_runs=3) -> dict:
+    import metrics
+    cold = []
+    for _ in range(cold_runs):
+        clear_caches()
+        cold.append(run(app_test(db_path, query, email)))
+    metrics.reset()
+    at = app_test(db_path, query, email)
+    run(at)
+    warm = [run(at) for _ in range(runs)]
+    return {
+        "cold": summarize(cold),
+        "warm": summarize(warm, peak_kb=peak_kb(at), elements=elements(at.main)),
+        "spans": metrics.snapshot(),
+    }
+
+def _session(db_path, query, runs, go=None) -> tuple:
+    # 자식 프로세스 하나 = 세션 하나. AppTest 는 실행할 때마다 전역 st.secrets 와 Runtime 싱글턴을 바꿔 끼우므로
+    # 한 프로세스에서 여러 스레드로 돌리면 서로 망가뜨린다.
+    at = app_test(db_path, query)
+    run(at)
+    if go: go()   # 모든 세션이 데워진 뒤 같이 시작
+    t0 = time.time()
+    lat = [run(at) for _ in range(runs)]
+    return lat, t0, time.time()
+
+SESSION = """
+import sys, json
+sys.path.insert(0, {here!r})
+import bench_app
+def go():
+    print("ready", flush=True)
+    sys.stdin.readline()
+print(json.dumps(bench_app._session({db!r}, {query!r}, {runs!r}, go)))
+"""
+
+def parallel(db_path, sessions, runs, query) -> dict:
+    """세션마다 인터프리터를 따로 띄워 동시에 재실행한다. 처리량은 warm 구간(첫 시작 ~ 마지막 끝) 기준."""
+    code = SESSION.format(here=HERE, db=db_path, query=query, runs=runs)
+    procs = [subprocess.Popen([sys.executable, "-c", code], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True) for _ in range(sessions)]
+    for p in procs:
+        if p.stdout.readline().strip() != "ready":
+            for q in procs: q.kill()
+            raise RuntimeError("session failed to start (run scenario share_small for the traceback)")
+    for p in procs:
+        p.stdin.write("go\n"); p.stdin.flush()
+    out = []
+    for p in procs:
+        stdout, _ = p.communicate()
+        if p.returncode: raise RuntimeError(f"session exited {p.returncode}")
+        out.append(json.loads(stdout.strip().splitlines()[-1]))
+    lat = [ms for r in out for ms in r[0]]
+    wall = max(r[2] for r in out) - min(r[1] for r in out)
+    return summarize(lat, sessions=sessions, reruns_per_s=round(len(lat) / wall, 1))
+
+def crawl(db_path, jobs) -> dict:
+    # 로컬 서버 하나(=도메인 하나)라서 도메인별 직렬 처리량을 잰다 (간격 제한은 0)
+    import storage, linkmeta, thumbs
+    sites = FakeSites()
+    try:
+        db = storage.Store(db_path, readers=1)
+        storage.enqueue_link_jobs(db, [f"{sites.base}/{sites.pages[i % len(sites.pages)]}?i={i}" for i in range(jobs)], time.time())
+        store = thumbs.ThumbStore(tempfile.mkdtemp(prefix="thumbs-"))
+        crawler = linkmeta.Crawler(db, workers=8, per_domain=0.0, thumb_store=store)
+        t0 = time.perf_counter()
+        crawler.drain()
+        secs = time.perf_counter() - t0
+        with db.read() as conn:
+            done = conn.execute("SELECT count(*) FROM link_meta WHERE url LIKE ?", (sites.base + "%",)).fetchone()[0]
+            thumbs_made = conn.execute("SELECT count(*) FROM link_meta WHERE url LIKE ? AND thumb IS NOT NULL", (sites.base + "%",)).fetchone()[0]
+        db.close()
+        return {"jobs": jobs, "resolved": done, "thumbs": thumbs_made, "seconds": round(secs, 2), "jobs_per_s": round(done / secs, 1) if secs else 0.0}
+    finally:
+        sites.close()
+
+# =========================
+# --- Report
+# =========================
+def environment() -> dict:
+    import streamlit
+    try:
+        commit = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"commit": commit, "python": sys.version.split()[0], "streamlit": streamlit.__version__, "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def compare(base: dict, cur: dict):
+    """시나리오별 p50 변화율. +10% 넘게 느려지면 표시."""
+    for name, r in cur["scenarios"].items():
+        b = base.get("scenarios", {}).get(name)
+        if not b: continue
+        for phase in ("cold", "warm"):
+            if phase in r and phase in b and b[phase]["p50_ms"]:
+                d = (r[phase]["p50_ms"] - b[phase]["p50_ms"]) / b[phase]["p50_ms"] * 100
+                flag = "  <-- slower" if d > 10 else ""
+                print(f"  {name:18s} {phase:4s} {b[phase]['p50_ms']:9.1f} -> {r[phase]['p50_ms']:9.1f} ms ({d:+.1f}%){flag}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shares", type=int, default=200)
+    ap.add_argument("--items", type=int, default=30)
+    ap.add_argument("--comments", type=int, default=20)
+    ap.add_argument("--big-items", type=int, default=1000)
+    ap.add_argument("--runs", type=int, default=10, help="시나리오별 warm 재실행 횟수")
+    ap.add_argument("--sessions", default="1,8,32", help="동시 세션 수 목록")
+    ap.add_argument("--crawl-jobs", type=int, default=200)
+    ap.add_argument("--only", help="이름에 이 문자열이 들어간 시나리오만")
+    ap.add_argument("--json", help="결과를 JSON 으로 저장")
+    ap.add_argument("--compare", help="이전 결과 JSON 과 p50 비교")
+    args = ap.parse_args()
+
+    out_json = os.path.abspath(args.json) if args.json else None
+    base_json = os.path.abspath(args.compare) if args.compare else None
+    work = tempfile.mkdtemp(prefix="bench-app-")
+    os.chdir(work)   # views.spool / static/thumbs 같은 런타임 파일이 저장소를 더럽히지 않도록
+    db_path = os.path.join(work, "shares.db")
+    ids = seeding.seed(db_path, args.shares, args.items, args.comments, args.big_items)
+    owner = seeding.OWNER
+
+    cases = {
+        "share_small": lambda: scenario(db_path, args.runs, {"share": ids["small"]}),
+        "share_big": lambda: scenario(db_path, args.runs, {"share": ids["big"]}),
+        "share_big_owner": lambda: scenario(db_path, args.runs, {"share": ids["big"]}, owner),
+        "my_list_small": lambda: scenario(db_path, args.runs, email=owner),
+        "my_list_big": lambda: scenario(db_path, args.runs, email="big-" + owner),
+        "discover": lambda: scenario(db_path, args.runs),
+    }
+    for n in (int(x) for x in args.sessions.split(",") if x):
+        cases[f"parallel_{n}"] = lambda n=n: parallel(db_path, n, max(1, args.runs // 2), {"share": ids["small"]})
+    cases["crawl"] = lambda: crawl(db_path, args.crawl_jobs)
+
+    results = {"env": environment(), "params": vars(args), "scenarios": {}}
+    for name, fn in cases.items():
+        if args.only and args.only not in name: continue
+        r = results["scenarios"][name] = fn()
+        if "warm" in r:
+            print(f"{name:18s} cold p50 {r['cold']['p50_ms']:9.1f} ms | warm p50 {r['warm']['p50_ms']:8.1f} p95 {r['warm']['p95_ms']:8.1f} ms | peak {r['warm']['peak_kb']:9.1f} KB | {r['warm']['elements']} elements")
+        else:
+            print(f"{name:18s} " + "  ".join(f"{k} {v}" for k, v in r.items()))
+    results["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if out_json:
+        with open(out_json, "w") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if base_json:
+        with open(base_json) as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
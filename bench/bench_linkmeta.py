@@ -0,0 +1,82 @@
+# bench_linkmeta.py
+# 링크 메타 추출 마이크로벤치: 예전 방식(전체 다운로드 + BeautifulSoup) vs linkmeta.extract_meta(스트리밍 <head> 파싱)
+#   python bench/bench_linkmeta.py [-n 200] [--json out.json]
+# 네트워크 없이 bench/fixtures/*.html 을 가짜 응답으로 흘려보낸다.
+import sys, os, time, json, argparse, tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import linkmeta
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+class FakeResponse:
+    """requests.Response 흉내: iter_content 로 읽힌 바이트 수를 센다."""
+    def __init__(self, body: bytes, url: str):
+        self.body, self.url = body, url
+        self.headers = {"Content-Type": "text/html; charset=utf-8"}
+        self.status_code = 200
+        self.bytes_read = 0
+
+    def iter_content(self, size):
+        for i in range(0, len(self.body), size):
+            self.bytes_read += len(self.body[i:i+size])
+            yield self.body[i:i+size]
+
+    @property
+    def text(self):
+        self.bytes_read = len(self.body)
+        return self.body.decode("utf-8")
+
+def old_impl(resp):
+    # 예전 project.fetch_og_thumb 의 파싱부 그대로
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(resp.text, "html.parser")
+    tag = soup.select_one('meta[property="og:image"], meta[name="twitter:image"]')
+    img = (tag.get("content") if tag else "") or ""
+    if img.startswith("//"): img = "https:" + img
+    return img
+
+def new_impl(resp):
+    return linkmeta.extract_meta(resp).image
+
+def measure(fn, body, n):
+    resp = FakeResponse(body, "https://example.com/page")
+    fn(resp)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(n):
+        resp = FakeResponse(body, "https://example.com/page")
+        out = fn(resp)
+    per = (time.perf_counter() - t0) / n
+    tracemalloc.start()
+    fn(FakeResponse(body, "https://example.com/page"))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"ms": round(per * 1000, 3), "bytes_read": resp.bytes_read, "peak_kb": round(peak / 1024, 1), "image": out}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=200)
+    ap.add_argument("--json", help="결과를 JSON 으로 저장")
+    args = ap.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        impls = {"bs4_full": old_impl, "stream_head": new_impl}
+    except ImportError:
+        print("bs4 미설치: 예전 구현은 건너뜀")
+        impls = {"stream_head": new_impl}
+
+    results = {}
+    for name in sorted(os.listdir(FIXTURES)):
+        if not name.endswith(".html"): continue
+        body = open(os.path.join(FIXTURES, name), "rb").read()
+        results[name] = {k: measure(fn, body, args.n) for k, fn in impls.items()}
+        print(f"{name} ({len(body)//1024} KB)")
+        for k, r in results[name].items():
+            print(f"  {k:12s} {r['ms']:8.3f} ms  read {r['bytes_read']//1024:4d} KB  peak {r['peak_kb']:8.1f} KB  {r['image'][:60]}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
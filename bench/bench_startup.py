@@ -0,0 +1,77 @@
+# bench_startup.py
+# 콜드 스타트 import 비용: 지금 project.py 가 맨 위에서 불러오는 모듈 vs 예전처럼 무거운 스택까지 다 불러올 때.
+#   python bench/bench_startup.py [-n 5] [--json out.json]
+# 매 측정은 새 인터프리터(subprocess)에서 하므로 import 캐시의 영향이 없다. 설치 안 된 모듈은 건너뛰고 표시한다.
+import sys, os, json, argparse, subprocess, statistics, importlib.util
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# project.py 최상단 import (지연 로딩 이후)
+EAGER_NOW = ["streamlit", "streamlit.components.v1", "storage", "engagement", "linkmeta", "userlist", "metrics", "auth", "listio"]
+# 예전에 최상단에서 같이 불러오던 것들 (이제는 처음 쓸 때 불러온다)
+LAZY = ["streamlit_oauth", "requests", "supabase", "pandas"]
+
+PROBE = """
+import sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+for m in {mods!r}:
+    __import__(m)
+print((time.perf_counter() - t0) * 1000)
+"""
+
+def installed(mod: str) -> bool:
+    # 저장소의 supabase/ (SQL 파일 폴더)가 네임스페이스 패키지로 잡히지 않도록 origin 이 있는 것만
+    try:
+        spec = importlib.util.find_spec(mod.split(".")[0])
+    except ValueError:
+        return False
+    return spec is not None and spec.origin is not None
+
+def measure(mods, n) -> list:
+    out = []
+    for _ in range(n):
+        r = subprocess.run([sys.executable, "-c", PROBE.format(root=ROOT, mods=mods)], capture_output=True, text=True, check=True)
+        out.append(float(r.stdout.strip()))
+    return out
+
+def deferred_cost(mods) -> list:
+    """python -X importtime 으로 본 모듈별 누적 import 시간 (각 모듈이 처음 불려올 때의 비용)."""
+    if not mods: return []
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {ROOT!r})\nfor m in {mods!r}: __import__(m)"],
+                       capture_output=True, text=True)
+    cost = {}
+    for line in r.stderr.splitlines():
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if line.startswith("import time:") and len(parts) == 3 and parts[1].isdigit() and parts[2] in mods:
+            cost[parts[2]] = int(parts[1]) / 1000
+    return [{"module": m, "cumulative_ms": round(ms, 1)} for m, ms in sorted(cost.items(), key=lambda kv: -kv[1])]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=5)
+    ap.add_argument("--json", help="결과를 JSON 으로 저장")
+    args = ap.parse_args()
+
+    now = [m for m in EAGER_NOW if installed(m)]
+    lazy = [m for m in LAZY if installed(m)]
+    missing = [m for m in EAGER_NOW + LAZY if not installed(m)]
+    if missing: print("미설치라 제외:", ", ".join(missing))
+
+    res = {}
+    for name, mods in (("lazy (now)", now), ("eager (before)", now + lazy)):
+        s = measure(mods, args.n)
+        res[name] = {"modules": mods, "median_ms": round(statistics.median(s), 1), "min_ms": round(min(s), 1)}
+        print(f"{name:15s} median {res[name]['median_ms']:8.1f} ms  min {res[name]['min_ms']:8.1f} ms")
+    saved = res["eager (before)"]["median_ms"] - res["lazy (now)"]["median_ms"]
+    print(f"{'saved':15s} {saved:8.1f} ms per process start")
+    res["deferred"] = deferred_cost(lazy)
+    for r in res["deferred"]:
+        print(f"  {r['module']:20s} {r['cumulative_ms']:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(dict(res, missing=missing, saved_ms=round(saved, 1)), f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
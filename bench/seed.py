@@ -0,0 +1,84 @@
+# seed.py
+# 벤치용 shares.db 만들기: 공유/항목/댓글/좋아요/조회/개인 목록/링크 메타를 원하는 크기로 채운다.
+#   python bench/seed.py --db /tmp/bench.db [--shares 200] [--items 30] [--comments 20] [--big-items 1000]
+# 네트워크 없이 storage + engagement.SQLiteEngagement 만 쓴다. 같은 --seed 면 같은 내용(공유 id 는 매번 새로).
+import sys, os, json, time, random, argparse
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import storage, engagement
+
+OWNER = "bench@example.com"
+TITLES = ["나 혼자만 레벨업", "신의 탑", "외모지상주의", "전지적 독자 시점", "화산귀환", "유미의 세포들",
+          "Tower of God", "Lore Olympus", "Omniscient Reader", "Solo Leveling", "마음의소리", "여신강림"]
+SITES = ["https://comic.naver.com/webtoon/list?titleId={}", "https://page.kakao.com/content/{}",
+         "https://webtoon.kakao.com/content/x/{}", "https://www.webtoons.com/en/fantasy/x/list?title_no={}"]
+
+def _items(rng, n, day):
+    return [{
+        "title": f"{rng.choice(TITLES)} {i}",
+        "link": rng.choice(SITES).format(rng.randrange(10**6)),
+        "note": rng.choice(["", "정주행 중", "완결", "재밌음", "다음 화 기다리는 중"]),
+        "updated_at": f"2025-01-{day:02d}T12:{i % 60:02d}:00",
+    } for i in range(n)]
+
+def _user_items(rng, n):
+    return [dict(it, id=f"{rng.getrandbits(48):012x}") for it in _items(rng, n, 1)]
+
+def seed(path, shares=200, items=30, comments=20, big_items=1000, viewers=50, seed=1, resolve_links=True) -> dict:
+    """
+    path 에 DB 를 새로 만들고 시나리오가 쓸 id 들을 돌려준다:
+    {"small": 10개짜리 공유, "big": big_items 개짜리 공유, "owner_small"/"owner_big": 개인 목록 owner 키}
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix): os.remove(path + suffix)
+    rng = random.Random(seed)
+    db = storage.Store(path, readers=1)
+    eng = engagement.SQLiteEngagement(db)
+    ids = []
+    for n in range(shares):
+        ids.append(storage.save_share(db, None, OWNER, "Bench", f"{rng.choice(TITLES)} 모음 {n}",
+                                      _items(rng, items, 1 + n % 28), True, f"2025-01-{1 + n % 28:02d}T00:00:00"))
+    small = storage.save_share(db, None, OWNER, "Bench", "small", _items(rng, 10, 28), True, "2025-02-01T00:00:00")
+    big = storage.save_share(db, None, OWNER, "Bench", "big", _items(rng, big_items, 28), True, "2025-02-01T00:00:00")
+    ids += [small, big]
+
+    # 좋아요/조회/댓글 (트랜잭션 단위로 한 번에)
+    now = time.time()
+    with db.write() as conn:
+        conn.executemany(eng.SQL_LIKE_INSERT, [(sid, f"user{u}@example.com", "2025-01-01T00:00:00+00:00")
+                                               for sid in ids for u in range(rng.randrange(0, 20))])
+        conn.executemany(eng.SQL_COMMENT_INSERT, [(sid, f"user{c % 7}@example.com", f"user{c % 7}", f"댓글 {c}",
+                                                   f"2025-01-{1 + c % 28:02d}T00:{c % 60:02d}:00+00:00")
+                                                  for sid in (small, big) for c in range(comments * 10)]
+                                                 + [(sid, None, None, f"c{c}", "2025-01-01T00:00:00+00:00")
+                                                    for sid in ids[:-2] for c in range(comments)])
+    eng.record_views([{"share_id": sid, "viewer": f"v{v}"} for sid in ids for v in range(rng.randrange(1, viewers))])
+    engagement.backfill_scores(db, eng, now)   # 운영 DB 업그레이드 때와 같은 경로로 점수 채우기
+
+    # 개인 목록
+    owner_small, owner_big = f"u:{OWNER}", "u:big-" + OWNER
+    storage.apply_user_ops(db, [(owner_small, it["id"], it) for it in _user_items(rng, 10)]
+                               + [(owner_big, it["id"], it) for it in _user_items(rng, big_items)])
+
+    # 링크 메타는 워커가 미리 채워둔 상태로 (resolve_links=False 면 큐에만 남는다)
+    if resolve_links:
+        with db.read() as conn:
+            urls = [r[0] for r in conn.execute("SELECT url FROM link_jobs")]
+        storage.put_link_meta(db, [(u, "", "", "", "", 1, now, now + 86400, None) for u in urls])
+        with db.write() as conn:
+            conn.execute("DELETE FROM link_jobs")
+    db.close()
+    return {"small": small, "big": big, "owner_small": owner_small, "owner_big": owner_big, "shares": len(ids)}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="bench.db")
+    ap.add_argument("--shares", type=int, default=200)
+    ap.add_argument("--items", type=int, default=30)
+    ap.add_argument("--comments", type=int, default=20)
+    ap.add_argument("--big-items", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--no-resolve", action="store_true", help="링크 메타를 채우지 않고 큐에만 남긴다")
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    out = seed(args.db, args.shares, args.items, args.comments, args.big_items, seed=args.seed, resolve_links=not args.no_resolve)
+    print(json.dumps(dict(out, seconds=round(time.perf_counter() - t0, 2)), ensure_ascii=False))
@@ -0,0 +1,604 @@
+# engagement.py
+# 좋아요/조회수/댓글 백엔드 (Streamlit 비의존)
+import os, glob, json, time, uuid, random, threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Protocol
+from hll import HLL
+import storage
+try:
+    import fcntl   # 스풀 파일 잠금 (POSIX). 없으면 다른 프로세스의 스풀은 되살리지 않는다
+except ImportError:
+    fcntl = None
+
+class Engagement(Protocol):
+    """
+    좋아요/조회수/댓글 백엔드 인터페이스. 구현: SupabaseEngagement(원격), SQLiteEngagement(shares.db),
+    MemoryEngagement(테스트). 앱은 st.secrets["app"]["engagement_backend"] 로 고른다.
+    """
+    def like_count(self, share_id: str) -> int: ...
+    def has_liked(self, share_id: str, email: str) -> bool: ...
+    def toggle_like(self, share_id: str, email: str) -> tuple: ...          # (liked, like_count)
+    def add_view(self, share_id: str): ...
+    def view_count(self, share_id: str) -> int: ...
+    def record_views(self, events): ...                                     # ViewBuffer 의 sink
+    def viewer_sketch(self, share_id: str) -> HLL: ...
+    def list_comments(self, share_id: str, limit=100, before=None) -> list: ...
+    def add_comment(self, share_id: str, email: str, name: str, text: str) -> dict: ...
+    def share_stats(self, share_id: str, email: str = None, add_view: bool = False) -> dict: ...
+    def score_history(self, share_id: str, since: float) -> tuple: ...          # (likes, views, comments, [(kind, ts)])
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _epoch(iso) -> float:
+    """백엔드가 돌려준 ISO 시각 -> epoch 초 (시간대 없으면 UTC 로 본다). 못 읽으면 None."""
+    try:
+        dt = datetime.fromisoformat(str(iso).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+class SupabaseEngagement:
+    """
+    Supabase(PostgREST) 구현. 클라이언트는 프로세스에서 하나만 만들어 재사용한다.
+    공유 페이지 통계는 share_stats RPC(supabase/share_stats.sql) 한 번으로 가져오고,
+    RPC 가 아직 배포되지 않은 DB 에서는 개별 쿼리로 자동 폴백한다.
+    """
+    def __init__(self, client):
+        self.sb = client
+        self._rpc_ok = True
+
+    def like_count(self, share_id: str) -> int:
+        res = self.sb.table("likes").select("share_id", count="exact").eq("share_id", share_id).execute()
+        return res.count or 0
+
+    def has_liked(self, share_id: str, email: str) -> bool:
+        res = self.sb.table("likes").select("*").eq("share_id", share_id).eq("email", email).limit(1).execute()
+        return len(res.data or []) > 0
+
+    def toggle_like(self, share_id: str, email: str):
+        """좋아요 토글 + 새 상태를 한 번의 RPC 로 (supabase/toggle_like.sql). -> (liked, like_count)"""
+        if self._rpc_ok:
+            try:
+                res = self.sb.rpc("toggle_like", {"p_share_id": share_id, "p_email": email}).execute()
+                row = (res.data or [{}])[0]
+                return bool(row.get("liked")), row.get("like_count") or 0
+            except Exception as e:
+                if getattr(e, "code", None) in ("PGRST202", "42883"):
+                    self._rpc_ok = False
+                else:
+                    raise
+        liked = self.has_liked(share_id, email)
+        if liked:
+            self.sb.table("likes").delete().eq("share_id", share_id).eq("email", email).execute()
+        else:
+            self.sb.table("likes").insert({"share_id": share_id, "email": email}).execute()
+        return not liked, self.like_count(share_id)
+
+    def add_view(self, share_id: str):
+        self.sb.table("views").insert({"share_id": share_id}).execute()
+
+    def view_count(self, share_id: str) -> int:
+        # 원본 views 를 세지 않고 record_views 가 올려둔 집계 카운터를 읽는다
+        res = self.sb.table("share_counters").select("views").eq("share_id", share_id).limit(1).execute()
+        return (res.data or [{}])[0].get("views") or 0
+
+    def record_views(self, events):
+        """
+        조회 이벤트 묶음을 한 번에 기록 + share_counters 증가 (supabase/view_counters.sql).
+        viewer 키는 보내지 않고, 공유별 HLL 스케치로 접어서 서버 스케치에 병합한다.
+        """
+        self.sb.rpc("record_views", {
+            "p_events": [{"share_id": ev["share_id"], "at": ev.get("at")} for ev in events],
+            "p_sketches": {sid: h.hex() for sid, h in viewer_sketches(events).items()},
+        }).execute()
+
+    def list_comments(self, share_id: str, limit=100, before=None):
+        """최신순. before=(created_at, id) 면 그보다 오래된 것만 (키셋 페이지네이션)."""
+        q = self.sb.table("comments").select("*").eq("share_id", share_id)
+        if before:
+            ts, cid = before
+            q = q.or_(f'created_at.lt."{ts}",and(created_at.eq."{ts}",id.lt.{cid})')
+        res = q.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
+        return res.data or []
+
+    def add_comment(self, share_id: str, email: str, name: str, text: str):
+        """삽입된 행을 반환 (PostgREST return=representation)."""
+        res = self.sb.table("comments").insert({
+            "share_id": share_id,
+            "email": email or None,
+            "name": name or None,
+            "text": text,
+        }).execute()
+        return (res.data or [None])[0]
+
+    def score_history(self, share_id: str, since: float):
+        """백필용. 원본 views 행은 since 이후 것만 읽는다 (그보다 오래된 조회는 trend 에 거의 0)."""
+        likes = self.sb.table("likes").select("*").eq("share_id", share_id).execute().data or []
+        comments = self.sb.table("comments").select("created_at").eq("share_id", share_id).execute().data or []
+        cutoff = datetime.fromtimestamp(since, timezone.utc).isoformat()
+        views = self.sb.table("views").select("created_at").eq("share_id", share_id).gte("created_at", cutoff).execute().data or []
+        events = [("like", _epoch(r.get("created_at"))) for r in likes] + [("comment", _epoch(r["created_at"])) for r in comments] \
+                 + [("view", _epoch(r["created_at"])) for r in views]
+        return len(likes), self.view_count(share_id), len(comments), [(k, ts) for k, ts in events if ts is not None]
+
+    def share_stats(self, share_id: str, email: str = None, add_view: bool = False) -> dict:
+        """조회 기록(선택) + {"likes","views","liked"} 를 한 번의 왕복으로."""
+        if self._rpc_ok:
+            try:
+                res = self.sb.rpc("share_stats", {
+                    "p_share_id": share_id,
+                    "p_email": email,
+                    "p_add_view": add_view,
+                }).execute()
+                row = (res.data or [{}])[0]
+                return {
+                    "likes": row.get("like_count") or 0,
+                    "views": row.get("view_count") or 0,
+                    "liked": bool(row.get("liked")),
+                    "viewers": HLL.from_hex(row.get("viewer_sketch")),
+                }
+            except Exception as e:
+                # 함수 미배포면 이후 호출은 바로 폴백, 그 외 오류는 이번 호출만 폴백
+                if getattr(e, "code", None) in ("PGRST202", "42883"):
+                    self._rpc_ok = False
+        if add_view: self.add_view(share_id)
+        return {
+            "likes": self.like_count(share_id),
+            "views": self.view_count(share_id),
+            "liked": bool(email) and self.has_liked(share_id, email),
+            "viewers": self.viewer_sketch(share_id),
+        }
+
+    def viewer_sketch(self, share_id: str) -> HLL:
+        res = self.sb.table("share_viewers").select("sketch").eq("share_id", share_id).limit(1).execute()
+        return HLL.from_hex((res.data or [{}])[0].get("sketch"))
+
+
+class MemoryEngagement:
+    """네트워크 없는 로컬 대역(테스트/오프라인 실행용). SupabaseEngagement 와 같은 인터페이스."""
+    def __init__(self):
+        self.likes = set()      # {(share_id, email)}
+        self.views = {}         # share_id -> count
+        self.comments = []      # [{share_id,email,name,text,created_at}]
+        self.sketches = {}      # share_id -> HLL
+
+    def like_count(self, share_id):
+        return sum(1 for s, _ in self.likes if s == share_id)
+
+    def has_liked(self, share_id, email):
+        return (share_id, email) in self.likes
+
+    def toggle_like(self, share_id, email):
+        self.likes ^= {(share_id, email)}
+        return self.has_liked(share_id, email), self.like_count(share_id)
+
+    def add_view(self, share_id):
+        self.views[share_id] = self.views.get(share_id, 0) + 1
+
+    def view_count(self, share_id):
+        return self.views.get(share_id, 0)
+
+    def list_comments(self, share_id, limit=100, before=None):
+        rows = [c for c in self.comments if c["share_id"] == share_id
+                and (not before or (c["created_at"], c["id"]) < tuple(before))]
+        return sorted(rows, key=lambda c: (c["created_at"], c["id"]), reverse=True)[:limit]
+
+    def record_views(self, events):
+        for ev in events: self.add_view(ev["share_id"])
+        for sid, h in viewer_sketches(events).items():
+            self.sketches[sid] = self.viewer_sketch(sid).merge(h)
+
+    def viewer_sketch(self, share_id):
+        return HLL(self.sketches[share_id].reg) if share_id in self.sketches else HLL()
+
+    def add_comment(self, share_id, email, name, text):
+        row = {"id": len(self.comments) + 1, "share_id": share_id, "email": email or None, "name": name or None,
+               "text": text, "created_at": _utcnow()}
+        self.comments.append(row)
+        return row
+
+    def score_history(self, share_id, since):
+        # 좋아요/조회는 시각을 안 들고 있어서 개수만
+        comments = [("comment", _epoch(c["created_at"])) for c in self.comments if c["share_id"] == share_id]
+        return self.like_count(share_id), self.view_count(share_id), len(comments), comments
+
+    def share_stats(self, share_id, email=None, add_view=False):
+        if add_view: self.add_view(share_id)
+        return {"likes": self.like_count(share_id), "views": self.view_count(share_id),
+                "liked": bool(email) and self.has_liked(share_id, email),
+                "viewers": self.viewer_sketch(share_id)}
+
+
+class SQLiteEngagement:
+    """
+    shares.db 에 같이 두는 로컬 구현 (storage._m12_engagement). 단일 노드 배포용이고,
+    네트워크 없이 테스트/벤치를 돌릴 때도 쓴다. 읽기는 커넥션 풀, 쓰기는 Store 의 단일 writer.
+    """
+    SQL_LIKE_COUNT = "SELECT count(*) FROM likes WHERE share_id=?"
+    SQL_HAS_LIKED = "SELECT 1 FROM likes WHERE share_id=? AND email=?"
+    SQL_LIKE_DELETE = "DELETE FROM likes WHERE share_id=? AND email=?"
+    SQL_LIKE_INSERT = "INSERT INTO likes(share_id, email, created_at) VALUES (?,?,?)"
+    SQL_COUNTER = "SELECT views, sketch FROM share_counters WHERE share_id=?"
+    SQL_COUNTER_ADD = """
+        INSERT INTO share_counters(share_id, views, sketch) VALUES (?,?,?)
+        ON CONFLICT(share_id) DO UPDATE SET views=views+excluded.views, sketch=coalesce(excluded.sketch, sketch)
+    """
+    SQL_COMMENTS = """SELECT id, share_id, email, name, text, created_at FROM comments
+                      WHERE share_id=? ORDER BY created_at DESC, id DESC LIMIT ?"""
+    SQL_COMMENTS_BEFORE = """SELECT id, share_id, email, name, text, created_at FROM comments
+                             WHERE share_id=? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?"""
+    SQL_COMMENT_INSERT = "INSERT INTO comments(share_id, email, name, text, created_at) VALUES (?,?,?,?,?)"
+    SQL_HISTORY = """SELECT 'like', created_at FROM likes WHERE share_id=?1
+                     UNION ALL SELECT 'comment', created_at FROM comments WHERE share_id=?1"""
+    _COMMENT_COLS = ("id", "share_id", "email", "name", "text", "created_at")
+
+    def __init__(self, db: storage.Store):
+        self.db = db
+
+    def like_count(self, share_id):
+        with self.db.read() as conn:
+            return conn.execute(self.SQL_LIKE_COUNT, (share_id,)).fetchone()[0]
+
+    def has_liked(self, share_id, email):
+        with self.db.read() as conn:
+            return conn.execute(self.SQL_HAS_LIKED, (share_id, email)).fetchone() is not None
+
+    def toggle_like(self, share_id, email):
+        with self.db.write() as conn:
+            liked = conn.execute(self.SQL_LIKE_DELETE, (share_id, email)).rowcount == 0
+            if liked: conn.execute(self.SQL_LIKE_INSERT, (share_id, email, _utcnow()))
+            return liked, conn.execute(self.SQL_LIKE_COUNT, (share_id,)).fetchone()[0]
+
+    def add_view(self, share_id):
+        self.record_views([{"share_id": share_id}])
+
+    def view_count(self, share_id):
+        with self.db.read() as conn:
+            row = conn.execute(self.SQL_COUNTER, (share_id,)).fetchone()
+        return row[0] if row else 0
+
+    def record_views(self, events):
+        """공유별로 조회수를 더하고 viewer 스케치는 저장된 것과 레지스터별 max 로 병합. 한 트랜잭션."""
+        counts = {}
+        for ev in events: counts[ev["share_id"]] = counts.get(ev["share_id"], 0) + 1
+        sketches = viewer_sketches(events)
+        with self.db.write() as conn:
+            rows = []
+            for sid, n in counts.items():
+                h = sketches.get(sid)
+                if h:
+                    old = conn.execute(self.SQL_COUNTER, (sid,)).fetchone()
+                    if old and old[1]: h.merge(HLL(old[1]))
+                rows.append((sid, n, bytes(h.reg) if h else None))
+            conn.executemany(self.SQL_COUNTER_ADD, rows)
+
+    def viewer_sketch(self, share_id):
+        with self.db.read() as conn:
+            row = conn.execute(self.SQL_COUNTER, (share_id,)).fetchone()
+        return HLL(row[1]) if row and row[1] else HLL()
+
+    def list_comments(self, share_id, limit=100, before=None):
+        with self.db.read() as conn:
+            if before:
+                rows = conn.execute(self.SQL_COMMENTS_BEFORE, (share_id, before[0], before[1], limit)).fetchall()
+            else:
+                rows = conn.execute(self.SQL_COMMENTS, (share_id, limit)).fetchall()
+        return [dict(zip(self._COMMENT_COLS, r)) for r in rows]
+
+    def add_comment(self, share_id, email, name, text):
+        row = {"share_id": share_id, "email": email or None, "name": name or None, "text": text, "created_at": _utcnow()}
+        with self.db.write() as conn:
+            row["id"] = conn.execute(self.SQL_COMMENT_INSERT,
+                                     (share_id, row["email"], row["name"], text, row["created_at"])).lastrowid
+        return row
+
+    def score_history(self, share_id, since):
+        # 조회는 share_counters 에 개수만 있고 시각이 없어서 trend 에는 좋아요/댓글만 들어간다
+        with self.db.read() as conn:
+            rows = conn.execute(self.SQL_HISTORY, (share_id,)).fetchall()
+            row = conn.execute(self.SQL_COUNTER, (share_id,)).fetchone()
+        events = [(k, _epoch(ts)) for k, ts in rows]
+        return (sum(k == "like" for k, _ in rows), row[0] if row else 0, sum(k == "comment" for k, _ in rows),
+                [(k, ts) for k, ts in events if ts is not None])
+
+    def share_stats(self, share_id, email=None, add_view=False):
+        if add_view: self.add_view(share_id)
+        with self.db.read() as conn:
+            likes = conn.execute(self.SQL_LIKE_COUNT, (share_id,)).fetchone()[0]
+            liked = bool(email) and conn.execute(self.SQL_HAS_LIKED, (share_id, email)).fetchone() is not None
+            row = conn.execute(self.SQL_COUNTER, (share_id,)).fetchone()
+        return {"likes": likes, "views": row[0] if row else 0, "liked": liked,
+                "viewers": HLL(row[1]) if row and row[1] else HLL()}
+
+
+def viewer_sketches(events) -> dict:
+    """이벤트 묶음의 viewer 키를 공유별 HLL 로 접는다 (viewer 없는 이벤트는 제외)."""
+    out = {}
+    for ev in events:
+        if ev.get("viewer"):
+            out.setdefault(ev["share_id"], HLL()).add(ev["viewer"])
+    return out
+
+
+class ViewBuffer:
+    """
+    조회 이벤트 write-behind 버퍼. add() 는 메모리 큐 + 스풀 파일 한 줄 append 만 하고 바로 돌아간다.
+    백그라운드 스레드가 flush_every 초마다 batch 개씩 sink(events) 로 보내고,
+    실패하면 지수 백오프로 재시도한다.
+    스풀은 프로세스마다 따로 쓴다 (<spool_path>.<pid>-<임의값>, 살아 있는 동안 flock). 기동할 때 잠겨 있지 않은
+    스풀(죽은 프로세스의 것)을 가져와 다시 보낸다. 파일은 보낸 줄이 남은 줄보다 많아질 때만 다시 써서
+    크기가 max_pending 의 두 배 안쪽에 머문다.
+    """
+    def __init__(self, sink, spool_path=None, flush_every=5.0, batch=500, max_backoff=300.0, max_pending=100_000):
+        self.sink = sink
+        self.flush_every = flush_every
+        self.batch = batch
+        self.max_backoff = max_backoff
+        self.max_pending = max_pending
+        self._events = deque()
+        self._inflight = []     # sink 로 보내는 중인 배치 (실패하면 큐 앞으로 되돌린다)
+        self._pending = {}      # share_id -> 아직 안 보낸 건수 (화면 표시 보정용)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._fails = 0
+        self._spool = None
+        self._lines = 0         # 내 스풀 파일의 줄 수 (이미 보냈거나 밀려난 줄 포함)
+        if spool_path:
+            self.spool_path = f"{spool_path}.{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            self._spool = self._open_spool(self.spool_path)
+            self._recover(spool_path)
+        else:
+            self.spool_path = None
+        threading.Thread(target=self._run, name="view-buffer", daemon=True).start()
+
+    @staticmethod
+    def _open_spool(path):
+        f = open(path, "a", encoding="utf-8")
+        if fcntl: fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return f
+
+    def _recover(self, base):
+        # 예전 버전의 공용 스풀(base) + 잠겨 있지 않은 다른 프로세스 스풀
+        paths = [base] + ([p for p in glob.glob(glob.escape(base) + ".*") if p != self.spool_path and not p.endswith(".tmp")]
+                          if fcntl else [])
+        for path in paths:
+            try: f = open(path, "r+", encoding="utf-8")
+            except OSError: continue
+            with f:
+                if fcntl:
+                    try: fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError: continue   # 살아 있는 프로세스의 스풀
+                    try:
+                        if os.fstat(f.fileno()).st_ino != os.stat(path).st_ino: continue   # 그 사이 주인이 새로 썼다
+                    except OSError: continue
+                evs = []
+                for line in f:
+                    try: evs.append(json.loads(line))
+                    except ValueError: pass   # 마지막 줄이 잘린 경우
+                with self._lock:
+                    for ev in evs: self._push(ev)
+                    self._append(evs)   # 내 스풀에 옮겨 적은 뒤에 원본을 지운다
+                os.remove(path)
+
+    def _push(self, ev):
+        self._events.append(ev)
+        self._pending[ev["share_id"]] = self._pending.get(ev["share_id"], 0) + 1
+        if len(self._events) > self.max_pending:
+            self._done([self._events.popleft()])
+
+    def _done(self, evs):
+        for ev in evs:
+            self._pending[ev["share_id"]] -= 1
+            if self._pending[ev["share_id"]] <= 0: self._pending.pop(ev["share_id"], None)
+
+    def _append(self, evs):
+        if not self._spool or not evs: return
+        self._spool.write("".join(json.dumps(ev, ensure_ascii=False) + "\n" for ev in evs))
+        self._spool.flush()
+        self._lines += len(evs)
+
+    def add(self, share_id: str, **extra):
+        ev = {"share_id": share_id, "at": datetime.now(timezone.utc).isoformat(timespec="seconds"), **extra}
+        with self._lock:
+            self._push(ev)
+            self._append([ev])
+
+    def pending(self, share_id: str) -> int:
+        return self._pending.get(share_id, 0)
+
+    def _compact_spool(self):
+        # 남은 줄이 없으면 비우고, 죽은 줄이 남은 줄보다 많아졌을 때만 새로 쓴다 (이벤트당 분할 상환 O(1)).
+        # 새 파일을 잠근 채로 rename 하므로 다른 프로세스가 중간에 가져가지 못한다
+        if not self._spool: return
+        live = len(self._events) + len(self._inflight)
+        if live == 0:
+            self._spool.truncate(0)
+            self._lines = 0
+            return
+        if self._lines - live < max(live, self.batch): return
+        tmp = self.spool_path + ".tmp"
+        f = self._open_spool(tmp)
+        f.write("".join(json.dumps(ev, ensure_ascii=False) + "\n" for ev in (*self._inflight, *self._events)))
+        f.flush()
+        os.replace(tmp, self.spool_path)
+        self._spool.close()
+        self._spool, self._lines = f, live
+
+    def flush(self) -> bool:
+        """한 배치를 보낸다. 보낼 게 없거나 성공하면 True."""
+        with self._lock:
+            n = min(self.batch, len(self._events))
+            batch = self._inflight = [self._events.popleft() for _ in range(n)]
+        if not batch: return True
+        try:
+            self.sink(batch)
+        except Exception:
+            with self._lock:
+                self._inflight = []
+                self._events.extendleft(reversed(batch))
+                while len(self._events) > self.max_pending:
+                    self._done([self._events.popleft()])
+            return False
+        with self._lock:
+            self._inflight = []
+            self._done(batch)
+            self._compact_spool()
+        return True
+
+    def _run(self):
+        while True:
+            if self._fails:
+                delay = min(self.max_backoff, self.flush_every * 2 ** self._fails) * random.uniform(0.5, 1.0)
+            else:
+                delay = self.flush_every
+            self._wake.wait(delay)
+            self._wake.clear()
+            ok = self.flush()
+            self._fails = 0 if ok else min(self._fails + 1, 16)
+            # 밀려 있으면 쉬지 않고 이어서 보낸다
+            while ok and len(self._events) >= self.batch:
+                ok = self.flush()
+
+
+class ScoreKeeper:
+    """
+    Discover 트렌딩 점수(storage.share_scores) 갱신기. 좋아요/조회/댓글 이벤트를 메모리에 모았다가
+    flush_every 초마다 한 트랜잭션으로 증분 반영한다. 렌더 경로에서는 리스트 append 만 한다.
+    """
+    def __init__(self, db, flush_every=2.0, max_likes=100000):
+        self.db = db
+        self.flush_every = flush_every
+        self.max_likes = max_likes
+        self._events = []
+        self._liked_at = OrderedDict()   # (share_id, email) -> 이 프로세스가 좋아요를 trend 에 넣은 시각
+        self._counts = {}       # share_id -> (likes, views) 백엔드 기준 정확한 값
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="score-keeper", daemon=True).start()
+
+    def record(self, share_id: str, kind: str, delta: int = 1):
+        with self._lock:
+            self._events.append((share_id, kind, delta, time.time()))
+
+    def like(self, share_id: str, email: str, liked: bool):
+        """
+        좋아요/취소. 취소는 그 좋아요가 들어간 시각의 (감쇠된) 가중치만큼만 trend 에서 빼야 하므로 여기서 기록한
+        시각을 쓰고, 모르면(재시작 전이나 다른 프로세스에서 준 좋아요) 개수만 줄인다.
+        """
+        now, key = time.time(), (share_id, email)
+        with self._lock:
+            if liked:
+                self._liked_at[key] = now
+                self._liked_at.move_to_end(key)
+                if len(self._liked_at) > self.max_likes: self._liked_at.popitem(last=False)
+                self._events.append((share_id, "like", 1, now))
+            else:
+                self._events.append((share_id, "like", -1, self._liked_at.pop(key, None)))
+
+    def sync(self, share_id: str, likes: int, views: int):
+        with self._lock:
+            self._counts[share_id] = (likes, views)
+
+    def flush(self):
+        with self._lock:
+            events, self._events = self._events, []
+            counts, self._counts = self._counts, {}
+        try:
+            if events: storage.apply_score_events(self.db, events)
+            if counts: storage.sync_score_counts(self.db, [(sid, l, v) for sid, (l, v) in counts.items()])
+        except Exception:
+            with self._lock:   # 다음 주기에 다시
+                self._events[:0] = events
+                for sid, c in counts.items(): self._counts.setdefault(sid, c)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_every)
+            self.flush()
+
+
+class CommentCache:
+    """
+    공유별 최신 댓글 한 페이지를 프로세스 전체(모든 세션)가 공유하는 캐시.
+    add() 는 write-through: 새 댓글을 캐시된 페이지 맨 앞에 끼워 넣어 재조회 없이 바로 보이게 한다.
+    더 오래된 페이지(older)는 (created_at, id) 커서로 그때그때 가져온다.
+    """
+    def __init__(self, backend, page=30, ttl=120.0, max_shares=2000):
+        self.backend = backend
+        self.page = page
+        self.ttl = ttl
+        self.max_shares = max_shares
+        self._pages = OrderedDict()     # share_id -> (expires_at, rows, has_more)
+        self._lock = threading.Lock()
+
+    def _fetch(self, share_id, before=None):
+        rows = self.backend.list_comments(share_id, self.page + 1, before)
+        return rows[:self.page], len(rows) > self.page
+
+    def newest(self, share_id: str):
+        """(rows, has_more)"""
+        with self._lock:
+            hit = self._pages.get(share_id)
+            if hit and hit[0] > time.time():
+                self._pages.move_to_end(share_id)
+                return hit[1], hit[2]
+        rows, more = self._fetch(share_id)
+        with self._lock:
+            self._pages[share_id] = (time.time() + self.ttl, rows, more)
+            while len(self._pages) > self.max_shares:
+                self._pages.popitem(last=False)
+        return rows, more
+
+    def older(self, share_id: str, last_row):
+        """last_row 보다 오래된 한 페이지. (rows, has_more)"""
+        return self._fetch(share_id, (last_row["created_at"], last_row["id"]))
+
+    def add(self, share_id: str, email: str, name: str, text: str):
+        row = self.backend.add_comment(share_id, email, name, text)
+        with self._lock:
+            hit = self._pages.get(share_id)
+            if not hit: return row
+            if not row:
+                self._pages.pop(share_id, None)
+                return row
+            expires, rows, more = hit
+            rows = [row] + rows
+            self._pages[share_id] = (expires, rows[:self.page], more or len(rows) > self.page)
+        return row
+
+
+def backfill_scores(db: storage.Store, eng: Engagement, now: float = None, window: float = 14*24*60*60, batch: int = 200) -> int:
+    """
+    share_scores 를 백엔드의 좋아요/조회/댓글로 처음부터 다시 채운다 (share_scores 도입 전에 쌓인 데이터용).
+    trend 는 시각을 아는 이벤트로만 접는다. 돌아가는 ScoreKeeper 의 증분과 섞이지 않도록 앱을 띄우기 전에 돌릴 것.
+    """
+    since = (now or time.time()) - window
+    rows, n = [], 0
+    for sid in storage.share_ids(db):
+        likes, views, comments, events = eng.score_history(sid, since)
+        rows.append((sid, likes, views, comments, storage.trend_of(events)))
+        if len(rows) >= batch:
+            storage.replace_scores(db, rows); n += len(rows); rows = []
+    if rows:
+        storage.replace_scores(db, rows); n += len(rows)
+    return n
+
+
+if __name__ == "__main__":
+    # python engagement.py backfill-scores [--db shares.db] [--backend sqlite|supabase]
+    #   supabase 면 SUPABASE_URL / SUPABASE_KEY 환경변수 (service role 키 권장 - 모든 행을 읽어야 한다)
+    import argparse
+    ap = argparse.ArgumentParser(description="engagement 관리")
+    ap.add_argument("command", choices=["backfill-scores"])
+    ap.add_argument("--db", default="shares.db")
+    ap.add_argument("--backend", choices=["sqlite", "supabase"], default="sqlite")
+    args = ap.parse_args()
+    store = storage.Store(args.db, readers=1)
+    if args.backend == "sqlite":
+        eng = SQLiteEngagement(store)
+    else:
+        from supabase import create_client
+        eng = SupabaseEngagement(create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"]))
+    print(f"{backfill_scores(store, eng)} shares rescored")
+    store.close()
@@ -0,0 +1,45 @@
+# hll.py
+# HyperLogLog 고유 방문자 추정기. 공유당 2^P 바이트 고정, 레지스터별 max 로 병합(교환/결합 법칙 성립)
+import math, hashlib
+
+P = 11                      # 레지스터 2048개 -> 표준오차 약 2.3%
+M = 1 << P
+_REST = 64 - P
+_ALPHA = 0.7213 / (1 + 1.079 / M)
+
+class HLL:
+    __slots__ = ("reg",)
+
+    def __init__(self, data: bytes = None):
+        self.reg = bytearray(data) if data and len(data) == M else bytearray(M)
+
+    @classmethod
+    def from_hex(cls, s):
+        """PostgREST 가 돌려주는 bytea("\\x0a1b...") 또는 순수 hex."""
+        if not s: return cls()
+        if s.startswith("\\x"): s = s[2:]
+        return cls(bytes.fromhex(s))
+
+    def hex(self) -> str:
+        return self.reg.hex()
+
+    def add(self, key: str) -> bool:
+        h = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+        idx = h >> _REST
+        rank = _REST - (h & ((1 << _REST) - 1)).bit_length() + 1
+        if rank > self.reg[idx]:
+            self.reg[idx] = rank
+            return True
+        return False
+
+    def merge(self, other: "HLL") -> "HLL":
+        self.reg = bytearray(map(max, self.reg, other.reg))
+        return self
+
+    def count(self) -> int:
+        s = math.fsum(2.0 ** -r for r in self.reg)
+        est = _ALPHA * M * M / s
+        if est <= 2.5 * M:
+            zeros = self.reg.count(0)
+            if zeros: est = M * math.log(M / zeros)   # 소규모 구간은 linear counting
+        return int(round(est))
@@ -0,0 +1,227 @@
+# linkmeta.py
+# 링크 미리보기(og:image 등) 조회: <head> 만 스트리밍 파싱 + shares.db 캐시 + 작업 큐를 비우는 워커
+#   python linkmeta.py [--db shares.db] [--thumbs <project.py 옆>/static/thumbs] [--workers 8] [--per-domain 1.0] [--once]
+# 앱은 캐시를 읽기만 하므로 이 워커가 앱과 같이 떠 있어야 미리보기가 채워진다 (devcontainer 는
+# postAttachCommand 에서 streamlit 과 함께 띄운다). 다른 환경에서는 앱과 같은 작업 디렉터리에서 별도 프로세스로 실행.
+import re, time, codecs, logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+import storage, thumbs
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (WebtoonShare/1.0)", "Accept-Language":"ko-KR,ko;q=0.9,en-US;q=0.8",
+           "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5"}
+OK_TTL = 7*24*60*60       # 성공(이미지 없음 포함)
+FAIL_TTL = 6*60*60        # 재시도를 다 써도 실패면 이만큼 캐시해서 죽은 링크를 계속 두드리지 않는다
+MAX_ATTEMPTS = 5
+RETRY_BASE = 30           # 재시도 간격: 30s, 60s, 120s, ...
+EVICT_EVERY = 10*60       # 썸네일 디스크 캐시 정리 주기
+REFRESH_EVERY = 10*60     # 만료된 캐시를 다시 큐에 넣는 주기 (앱은 캐시를 읽기만 한다)
+CHUNK = 16*1024
+MAX_HEAD_BYTES = 256*1024  # </head> 를 못 만나도 여기까지만 읽는다
+
+LinkMeta = namedtuple("LinkMeta", "image title site_name description")
+EMPTY_META = LinkMeta("", "", "", "")
+
+# meta 키 -> LinkMeta 필드 (앞에 있을수록 우선)
+META_KEYS = {
+    "og:image": "image", "og:image:url": "image", "og:image:secure_url": "image", "twitter:image": "image",
+    "og:title": "title", "twitter:title": "title",
+    "og:site_name": "site_name",
+    "og:description": "description", "twitter:description": "description", "description": "description",
+}
+_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+class _HeadParser(HTMLParser):
+    """<head> 의 meta/title 만 모으고 </head> 나 <body> 를 만나면 done."""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found = {}
+        self.title = []
+        self.in_title = False
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            a = dict(attrs)
+            key = (a.get("property") or a.get("name") or "").lower()
+            field = META_KEYS.get(key)
+            if field and a.get("content") and field not in self.found:
+                self.found[field] = a["content"].strip()
+        elif tag == "title":
+            self.in_title = True
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title": self.in_title = False
+        elif tag == "head": self.done = True
+
+    def handle_data(self, data):
+        if self.in_title: self.title.append(data)
+
+def _encoding(resp, first: bytes) -> str:
+    ctype = resp.headers.get("Content-Type", "")
+    if "charset=" in ctype.lower():
+        enc = ctype.lower().split("charset=")[-1].split(";")[0].strip(" \"'")
+    else:
+        m = _CHARSET_RE.search(first)
+        enc = m.group(1).decode("ascii") if m else "utf-8"
+    try:
+        codecs.lookup(enc)
+        return enc
+    except LookupError:
+        return "utf-8"
+
+def extract_meta(resp, max_bytes=MAX_HEAD_BYTES) -> LinkMeta:
+    """
+    스트리밍 응답에서 <head> 만 점진적으로 파싱한다. HTML 이 아니면 본문을 읽지 않고,
+    </head>(또는 <body>) 를 만나거나 max_bytes 를 넘으면 즉시 멈춘다.
+    """
+    if "html" not in resp.headers.get("Content-Type", "text/html").lower():
+        return EMPTY_META
+    p, dec, read = _HeadParser(), None, 0
+    for chunk in resp.iter_content(CHUNK):
+        if not chunk: continue
+        if dec is None:
+            dec = codecs.getincrementaldecoder(_encoding(resp, chunk))(errors="replace")
+        read += len(chunk)
+        p.feed(dec.decode(chunk))
+        if p.done or read >= max_bytes: break
+    f = p.found
+    img = f.get("image", "")
+    if img: img = urljoin(getattr(resp, "url", "") or "", img)
+    title = f.get("title") or " ".join("".join(p.title).split())
+    return LinkMeta(img, title, f.get("site_name", ""), f.get("description", ""))
+
+def fetch_meta(session, url: str, timeout=4.0):
+    """(LinkMeta, ok) 반환. 네트워크 오류/비정상 응답은 ok=False."""
+    try:
+        with session.get(url, headers=HEADERS, timeout=timeout, stream=True) as r:
+            if r.status_code != 200: return EMPTY_META, False
+            return extract_meta(r), True
+    except Exception:
+        return EMPTY_META, False
+
+def fetch_image(session, url: str, timeout=6.0, max_bytes=thumbs.MAX_SOURCE_BYTES) -> bytes:
+    """원본 이미지 바이트. 이미지가 아니거나 너무 크거나 실패하면 b""."""
+    try:
+        with session.get(url, headers=HEADERS, timeout=timeout, stream=True) as r:
+            if r.status_code != 200 or not r.headers.get("Content-Type", "image/").startswith("image/"): return b""
+            buf = bytearray()
+            for chunk in r.iter_content(64*1024):
+                buf += chunk
+                if len(buf) > max_bytes: return b""
+            return bytes(buf)
+    except Exception:
+        return b""
+
+_THUMBS = thumbs.ThumbStore()
+
+def cached_images(db: storage.Store, urls, width: int = thumbs.WIDTHS[-1]) -> dict:
+    """
+    앱(렌더 경로)용: 미리 계산된 결과만 읽는다 {url: 이미지}. 워커가 줄여둔 로컬 축소본이 있으면 그 파일 경로,
+    없으면 원격 og:image URL, 실패는 "". 캐시에 없거나 만료된 URL 은 결과에서 빠진다 - 큐에는 저장할 때
+    (storage.save_share) 들어가고 만료분은 워커가 다시 넣으므로 여기서는 쓰기도 네트워크도 없다.
+    """
+    urls = {u for u in urls if u}
+    if not urls: return {}
+    return {u: _THUMBS.path(m["thumb"], width) or m["image"] for u, m in storage.get_link_meta(db, urls, time.time()).items()}
+
+class Crawler:
+    """
+    link_jobs 큐를 비우는 워커. 한 번에 도메인당 하나씩 최대 workers 개를 선점해서 병렬로 가져오고,
+    같은 도메인은 per_domain 초에 한 번만 두드린다. 실패는 지수 백오프로 MAX_ATTEMPTS 번까지 재시도.
+    """
+    def __init__(self, db: storage.Store, workers: int = 8, per_domain: float = 1.0, timeout: float = 6.0, lease: float = 60.0,
+                 thumb_store: thumbs.ThumbStore = _THUMBS):
+        self.db = db
+        self.thumbs = thumb_store
+        self.workers = workers
+        self.per_domain = per_domain
+        self.timeout = timeout
+        self.lease = lease
+        import requests   # 앱은 캐시만 읽으므로 HTTP 스택은 워커에서만 불러온다
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="link-crawl")
+        self._next_at = {}      # domain -> 다음에 요청해도 되는 시각
+
+    def _thumb(self, image_url) -> str:
+        # 원본을 한 번만 받아서 고정 크기로 줄여 둔다. 실패하면 앱이 원격 URL 을 그대로 쓴다
+        if not (image_url and self.thumbs.enabled): return ""
+        data = fetch_image(self.session, image_url, self.timeout)
+        if not data: return ""
+        try:
+            return self.thumbs.put(data)
+        except ValueError:
+            return ""
+
+    def _work(self, url, attempts):
+        meta, ok = fetch_meta(self.session, url, self.timeout)
+        now = time.time()
+        if ok or attempts + 1 >= MAX_ATTEMPTS:
+            thumb = self._thumb(meta.image) if ok else ""
+            storage.finish_link_job(self.db, url, (url, *meta, 1 if ok else 0, now, now + (OK_TTL if ok else FAIL_TTL), thumb or None))
+        else:
+            storage.retry_link_job(self.db, url, now + RETRY_BASE * 2 ** attempts, "fetch failed")
+        return ok
+
+    def run_once(self) -> int:
+        """한 묶음 처리하고 처리한 작업 수를 돌려준다."""
+        now = time.time()
+        busy = [d for d, t in self._next_at.items() if t > now]
+        jobs = storage.claim_link_jobs(self.db, now, self.workers, self.lease, busy)
+        for _, domain, _ in jobs:
+            self._next_at[domain] = now + self.per_domain
+        futs = [self.pool.submit(self._work, url, attempts) for url, _, attempts in jobs]
+        for f in futs:
+            try:
+                f.result()
+            except Exception:
+                logging.exception("link job failed")   # 선점이 풀리면 다시 가져간다
+        self._next_at = {d: t for d, t in self._next_at.items() if t > time.time()}
+        return len(jobs)
+
+    def drain(self):
+        """지금 실행할 수 있는 작업이 없을 때까지 처리 (도메인 간격 때문에 밀린 것은 기다렸다가)."""
+        while self.run_once() or self._next_at:
+            time.sleep(min(self.per_domain, 0.2))
+
+    def run(self, idle: float = 2.0):
+        evicted_at = refreshed_at = 0.0
+        while True:
+            if time.time() - refreshed_at > REFRESH_EVERY:
+                storage.enqueue_expired_links(self.db, time.time())
+                refreshed_at = time.time()
+            if not self.run_once():
+                time.sleep(idle)
+            if time.time() - evicted_at > EVICT_EVERY:
+                self.thumbs.evict()
+                evicted_at = time.time()
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="링크 미리보기 워커")
+    ap.add_argument("--db", default="shares.db")
+    ap.add_argument("--thumbs", default=thumbs.ROOT, help="썸네일 축소본 저장 위치 (앱과 같은 곳)")
+    ap.add_argument("--thumbs-max-mb", type=int, default=thumbs.MAX_CACHE_BYTES // (1024*1024))
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--per-domain", type=float, default=1.0, help="같은 도메인 요청 간 최소 간격(초)")
+    ap.add_argument("--once", action="store_true", help="지금 밀린 작업만 처리하고 종료")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if thumbs.Image is None:
+        logging.warning("Pillow 미설치: 썸네일 축소본 없이 메타데이터만 저장")
+    crawler = Crawler(storage.Store(args.db, readers=1), args.workers, args.per_domain,
+                      thumb_store=thumbs.ThumbStore(args.thumbs, args.thumbs_max_mb * 1024 * 1024))
+    if args.once:
+        storage.enqueue_expired_links(crawler.db, time.time())
+        crawler.drain()
+        crawler.thumbs.evict()
+    else:
+        crawler.run()
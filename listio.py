@@ -0,0 +1,171 @@
+# listio.py
+# 목록 가져오기/내보내기 (CSV, JSON 배열, JSON Lines). 파일 전체를 메모리에 올리지 않고 항목 단위로 흘려 보낸다 (Streamlit 비의존).
+#   가져오기: iter_items(f, name) -> {"title","link","note"} dict 를 하나씩 (검증/정규화는 호출하는 쪽)
+#   내보내기: write_items(items, f, fmt) -> 항목 iterator 를 CSV/JSON 으로 조금씩 써 나간다
+import io, csv, json, tempfile
+
+FIELDS = ("title", "link", "note")
+# 다른 서비스에서 뽑은 파일도 받을 수 있게 흔한 헤더 이름을 같이 본다
+ALIASES = {
+    "title": "title", "name": "title", "제목": "title", "작품": "title", "작품명": "title",
+    "link": "link", "url": "link", "href": "link", "링크": "link", "주소": "link",
+    "note": "note", "memo": "note", "comment": "note", "메모": "note", "비고": "note",
+}
+CHUNK = 64 * 1024
+MAX_FIELD = 4096          # 한 칸이 이보다 길면 자른다 (csv 모듈 한도 field_size_limit 를 넘는 칸은 FormatError)
+MAX_ELEMENT = 1024*1024   # JSON 요소 하나가 이보다 크면 깨진 파일로 본다 (버퍼가 파일 전체로 불어나지 않게)
+
+class FormatError(ValueError):
+    """파일 형식을 알 수 없거나 JSON 이 깨졌을 때. 그 전까지 읽은 항목은 이미 내보낸 상태다."""
+
+def _clip(v) -> str:
+    return ("" if v is None else str(v)).strip()[:MAX_FIELD]
+
+def _pick(row: dict) -> dict:
+    out = {}
+    for k, v in row.items():
+        f = ALIASES.get(str(k or "").strip().lower())
+        if f and f not in out: out[f] = _clip(v)
+    return {f: out.get(f, "") for f in FIELDS}
+
+def _text(f):
+    # 업로드 파일(바이너리)이든 텍스트 파일이든 한 줄씩 읽히는 텍스트 스트림으로 (BOM 은 버린다)
+    if isinstance(f, io.TextIOBase): return f
+    return io.TextIOWrapper(f, encoding="utf-8-sig", errors="replace", newline="")
+
+def iter_csv(f):
+    """헤더 있는 CSV. 헤더에 아는 열이 없으면 첫 세 열을 title, link, note 로 본다."""
+    reader = csv.reader(_text(f))
+    rows = _csv_rows(reader)
+    head = next(rows, None)
+    if head is None: return
+    cols = [ALIASES.get(h.strip().lower()) for h in head]
+    if not any(cols):
+        cols = list(FIELDS)
+        rows = _chain([head], rows)
+    for r in rows:
+        if not any(c.strip() for c in r): continue
+        yield _pick({c: v for c, v in zip(cols, r) if c})
+
+def _csv_rows(reader):
+    # csv.Error(칸이 너무 김, 따옴표 안 닫힘 등)도 화면에서 잡을 수 있게 FormatError 로
+    try:
+        yield from reader
+    except csv.Error as e:
+        raise FormatError(f"CSV 형식 오류 ({reader.line_num}행): {e}") from None
+
+def _chain(first, rest):
+    yield from first
+    yield from rest
+
+def iter_json(f):
+    """
+    JSON 배열([{...}, ...]) 이나 JSON Lines. 요소 하나씩 raw_decode 로 잘라 읽으므로
+    버퍼에는 '지금 읽는 요소 + 청크 하나'만 남는다.
+    """
+    src = _text(f)
+    dec = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def more():
+        nonlocal buf, pos, eof
+        chunk = src.read(CHUNK)
+        if not chunk: eof = True
+        buf, pos = buf[pos:] + chunk, 0
+
+    def skip(chars=" \t\r\n"):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars: pos += 1
+            if pos < len(buf) or eof: return
+            more()
+
+    def obj():
+        v = value()
+        if not isinstance(v, dict): raise FormatError(f"JSON 형식 오류: 항목은 객체여야 합니다 ({type(v).__name__})")
+        return _pick(v)
+
+    def value():
+        nonlocal pos
+        while True:
+            try:
+                v, end = dec.raw_decode(buf, pos)
+                # 숫자처럼 청크 경계에서 잘려도 성공해 버리는 값은 다음 청크를 보고 다시
+                if end < len(buf) or eof:
+                    pos = end
+                    return v
+            except json.JSONDecodeError as e:
+                if eof or len(buf) - pos > MAX_ELEMENT: raise FormatError(f"JSON 형식 오류: {e}") from None
+            more()
+
+    skip()
+    if pos >= len(buf): return
+    if buf[pos] == "{":   # JSON Lines
+        while pos < len(buf):
+            yield obj()
+            skip()
+        return
+    if buf[pos] != "[": raise FormatError("JSON 은 배열이나 JSON Lines 여야 합니다")
+    pos += 1
+    skip()
+    c = buf[pos:pos + 1]
+    if c == "]": pos += 1
+    while c != "]":
+        yield obj()
+        skip()
+        if pos >= len(buf): raise FormatError("JSON 배열이 닫히지 않았습니다")
+        c = buf[pos]; pos += 1
+        if c not in ",]": raise FormatError(f"JSON 형식 오류: 예상치 못한 {c!r}")
+        skip()
+    skip()
+    if pos < len(buf): raise FormatError(f"JSON 형식 오류: 배열 뒤에 남은 내용 {buf[pos:pos + 20]!r}")
+
+def iter_items(f, name: str = ""):
+    """확장자로 형식을 고른다 (.csv / .json / .jsonl / .ndjson)."""
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    if ext == "csv": return iter_csv(f)
+    if ext in ("json", "jsonl", "ndjson"): return iter_json(f)
+    raise FormatError(f"지원하지 않는 파일 형식: {name}")
+
+def batched(it, n):
+    buf = []
+    for x in it:
+        buf.append(x)
+        if len(buf) >= n:
+            yield buf
+            buf = []
+    if buf: yield buf
+
+# =========================
+# --- Export
+# =========================
+EXPORT_FIELDS = ("title", "link", "note", "updated_at")
+
+def write_items(items, out, fmt="csv"):
+    """items(iterator)를 out(텍스트 스트림)에 한 항목씩 쓴다. 쓴 항목 수를 돌려준다."""
+    n = 0
+    if fmt == "csv":
+        w = csv.writer(out)
+        w.writerow(EXPORT_FIELDS)
+        for it in items:
+            w.writerow([it.get(k) or "" for k in EXPORT_FIELDS])
+            n += 1
+    elif fmt == "json":
+        out.write("[")
+        for it in items:
+            out.write(("," if n else "") + "\n" + json.dumps({k: it.get(k) or "" for k in EXPORT_FIELDS}, ensure_ascii=False))
+            n += 1
+        out.write("\n]\n")
+    else:
+        raise ValueError(fmt)
+    return n
+
+def export_file(items, fmt="csv", directory=None) -> str:
+    """
+    items 를 임시 파일에 흘려 쓰고 경로를 돌려준다 (지우는 건 호출하는 쪽). CSV 는 엑셀이 한글을
+    제대로 읽도록 BOM 을 붙인다.
+    """
+    fd, path = tempfile.mkstemp(prefix="export-", suffix="." + fmt, dir=directory)
+    with open(fd, "w", encoding="utf-8-sig" if fmt == "csv" else "utf-8", newline="") as out:
+        write_items(items, out, fmt)
+    return path
@@ -0,0 +1,118 @@
+# metrics.py
+# 재실행 핫패스 계측: 이름별 지연 히스토그램(건수/오류/p50/p95/p99). 프로세스 전역이고 Streamlit 비의존.
+# 꺼져 있으면 timed/span 은 전역 플래그 하나만 보고 그대로 통과하므로 운영에서 켜 둬도 된다.
+import time, json, threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+ENABLED = False
+BUCKETS = tuple(0.05 * 2 ** i for i in range(22))   # 버킷 상한(ms): 0.05ms 부터 2배씩 ~105s, 그 위는 +Inf
+
+class Histogram:
+    __slots__ = ("counts", "count", "errors", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = self.errors = 0
+        self.total = self.max = 0.0
+
+    def observe(self, ms: float, error: bool = False):
+        self.counts[bisect_left(BUCKETS, ms)] += 1
+        self.count += 1
+        self.errors += error
+        self.total += ms
+        if ms > self.max: self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """버킷 안에서 선형 보간한 근사 분위수(ms)."""
+        if not self.count: return 0.0
+        rank, cum = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            if c and cum + c >= rank:
+                lo = BUCKETS[i - 1] if i else 0.0
+                hi = min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+                return lo + (hi - lo) * (rank - cum) / c
+            cum += c
+        return self.max
+
+_hists = {}
+_lock = threading.Lock()
+_started = time.time()
+
+def enable(on: bool = True):
+    global ENABLED
+    ENABLED = bool(on)
+
+def observe(name: str, ms: float, error: bool = False):
+    with _lock:
+        h = _hists.get(name)
+        if h is None: h = _hists[name] = Histogram()
+        h.observe(ms, error)
+
+def timed(name: str):
+    """함수 호출 시간을 name 히스토그램에 기록. Streamlit 의 st.rerun/st.stop(BaseException)은 오류로 세지 않는다."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED: return fn(*args, **kwargs)
+            t0, err = time.perf_counter(), False
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                err = True
+                raise
+            finally:
+                observe(name, (time.perf_counter() - t0) * 1000, err)
+        return wrapper
+    return deco
+
+@contextmanager
+def span(name: str):
+    if not ENABLED:
+        yield
+        return
+    t0, err = time.perf_counter(), False
+    try:
+        yield
+    except Exception:
+        err = True
+        raise
+    finally:
+        observe(name, (time.perf_counter() - t0) * 1000, err)
+
+def reset():
+    global _started
+    with _lock:
+        _hists.clear()
+        _started = time.time()
+
+def snapshot() -> list:
+    """[{name, count, errors, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}] - 총 소요 시간 큰 순."""
+    with _lock:
+        hs = sorted(_hists.items(), key=lambda kv: -kv[1].total)
+        return [{
+            "name": name, "count": h.count, "errors": h.errors,
+            "mean_ms": round(h.total / h.count, 3) if h.count else 0.0,
+            "p50_ms": round(h.quantile(0.50), 3), "p95_ms": round(h.quantile(0.95), 3),
+            "p99_ms": round(h.quantile(0.99), 3), "max_ms": round(h.max, 3),
+        } for name, h in hs]
+
+def to_json() -> str:
+    return json.dumps({"since": _started, "spans": snapshot()}, ensure_ascii=False, indent=2)
+
+def to_prometheus(prefix: str = "webtoon") -> str:
+    """Prometheus text exposition 형식 (초 단위 히스토그램 + 오류 카운터). 메트릭 패밀리별로 줄을 모아서 쓴다."""
+    hist, errs = [f"# TYPE {prefix}_span_seconds histogram"], [f"# TYPE {prefix}_span_errors_total counter"]
+    with _lock:
+        for name, h in sorted(_hists.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            cum = 0
+            for le, c in zip(BUCKETS, h.counts):
+                cum += c
+                hist.append(f'{prefix}_span_seconds_bucket{{name="{label}",le="{le / 1000:g}"}} {cum}')
+            hist.append(f'{prefix}_span_seconds_bucket{{name="{label}",le="+Inf"}} {h.count}')
+            hist.append(f'{prefix}_span_seconds_sum{{name="{label}"}} {h.total / 1000:.6f}')
+            hist.append(f'{prefix}_span_seconds_count{{name="{label}"}} {h.count}')
+            errs.append(f'{prefix}_span_errors_total{{name="{label}"}} {h.errors}')
+    return "\n".join(hist + errs) + "\n"
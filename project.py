@@ -1,14 +1,17 @@
 # app.py
 import streamlit as st
-import sqlite3, json, os, time, uuid, re
+import os, time, uuid, math, hmac, shutil, hashlib, html
 from datetime import datetime
-from streamlit_oauth import OAuth2Component
-import requests
-from bs4 import BeautifulSoup
-from supabase import create_client, Client
 import streamlit.components.v1 as components
+import storage, engagement, linkmeta, userlist, metrics, auth, listio
 
+RERUN_T0 = time.perf_counter()
+APP_DIR = os.path.dirname(os.path.abspath(__file__))   # Streamlit 정적 파일(app/static/...)의 기준
 st.set_page_config(page_title="웹툰 공유 리스트", layout="wide")
+# st.fragment / st.rerun(scope="fragment") / st.context / st.query_params 를 쓰므로 1.37 이상이어야 한다
+if tuple(int(x) for x in st.__version__.split(".")[:2]) < (1, 37):
+    st.error(f"Streamlit 1.37 이상이 필요합니다 (현재 {st.__version__}): pip install -U 'streamlit>=1.37'")
+    st.stop()
 
 # =========================
 # --- Secrets / Config
@@ -23,89 +26,156 @@ def require_secret(path: str):
     return cur
 
 GOOGLE = require_secret("google_oauth")
-SUPA = require_secret("supabase")
-APP = st.secrets.get("app", {})  # admin_email 등
+APP = st.secrets.get("app", {})  # admin_email, engagement_backend("supabase"|"sqlite"|"memory"), db_file 등
+ENGAGEMENT_BACKEND = APP.get("engagement_backend", "supabase")
+metrics.enable(APP.get("metrics", False))   # 재실행 핫패스 계측 (관리자 탭에서 확인)
 
 # =========================
 # --- DB (SQLite for shares data)
 # =========================
-DB_FILE = "shares.db"
-def db():
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS shares (
-            id TEXT PRIMARY KEY,
-            owner_email TEXT,
-            owner_name TEXT,
-            title TEXT,
-            data_json TEXT,
-            is_public INTEGER DEFAULT 1,
-            created_at TEXT,
-            updated_at TEXT
-        )
-    """)
-    return conn
+DB_FILE = APP.get("db_file", "shares.db")
+
+@st.cache_resource(show_spinner=False)
+def db() -> storage.Store:
+    # 프로세스당 한 번만 생성: 스키마/마이그레이션도 이때 한 번 실행된다
+    return storage.Store(DB_FILE)
 
 # =========================
-# --- Supabase (likes/views/comments)
+# --- Engagement backend (likes/views/comments)
 # =========================
-def supa() -> Client:
-    return create_client(SUPA["url"], SUPA["anon_key"])
+@st.cache_resource(show_spinner=False)
+def supa():
+    from supabase import create_client   # 무거워서 Supabase 백엔드를 쓸 때만 불러온다
+    supa_cfg = require_secret("supabase")
+    return create_client(supa_cfg["url"], supa_cfg["anon_key"])
+
+@st.cache_resource(show_spinner=False)
+def backend() -> engagement.Engagement:
+    # 단일 노드면 "sqlite" 로 shares.db 에 같이 두면 왕복이 없다. "memory" 는 테스트/벤치용
+    if ENGAGEMENT_BACKEND == "sqlite":
+        return engagement.SQLiteEngagement(db())
+    if ENGAGEMENT_BACKEND == "memory":
+        return engagement.MemoryEngagement()
+    return engagement.SupabaseEngagement(supa())
 
+@metrics.timed("engagement.like_count")
 def get_like_count(share_id: str) -> int:
-    sb = supa()
-    res = sb.table("likes").select("share_id", count="exact").eq("share_id", share_id).execute()
-    return res.count or 0
+    return backend().like_count(share_id)
 
+@metrics.timed("engagement.has_liked")
 def has_liked(share_id: str, email: str) -> bool:
-    sb = supa()
-    res = sb.table("likes").select("*").eq("share_id", share_id).eq("email", email).limit(1).execute()
-    return len(res.data or []) > 0
+    return backend().has_liked(share_id, email)
 
+@metrics.timed("engagement.toggle_like")
 def toggle_like(share_id: str, email: str):
-    sb = supa()
-    if has_liked(share_id, email):
-        sb.table("likes").delete().eq("share_id", share_id).eq("email", email).execute()
-    else:
-        sb.table("likes").insert({"share_id": share_id, "email": email}).execute()
+    return backend().toggle_like(share_id, email)
+
+@metrics.timed("engagement.view_count")
+def get_view_count(share_id: str) -> int:
+    return backend().view_count(share_id)
+
+@st.cache_resource(show_spinner=False)
+def scores() -> engagement.ScoreKeeper:
+    return engagement.ScoreKeeper(db())
+
+@st.cache_resource(show_spinner=False)
+def share_cache() -> storage.ShareCache:
+    # 인기 공유는 모든 세션이 같은 디코딩 결과를 본다 (version 이 바뀔 때만 다시 읽음)
+    return storage.ShareCache(db())
+
+@st.cache_resource(show_spinner=False)
+def list_writer() -> userlist.ListWriter:
+    return userlist.ListWriter(db())
+
+@st.cache_resource(show_spinner=False)
+def view_buffer() -> engagement.ViewBuffer:
+    # 조회 기록은 렌더 경로에서 빼서 백그라운드로 묶어 보낸다
+    return engagement.ViewBuffer(backend().record_views, spool_path="views.spool")
+
+def viewer_key() -> str:
+    # 고유 방문자 키: 로그인했으면 이메일, 아니면 브라우저 쿠키(wt_cid)에 심어둔 익명 id
+    user = st.session_state.get("user")
+    if user and user.get("email"): return "u:" + user["email"]
+    cid = st.session_state.get("__cid")
+    if not cid:
+        cookies = st.context.cookies
+        cid = cookies.get("wt_cid") or uuid.uuid4().hex
+        st.session_state["__cid"] = cid
+        if "wt_cid" not in cookies:
+            components.html(f"""<script>
+            parent.document.cookie = "wt_cid={cid}; path=/; max-age=31536000; SameSite=Lax";
+            </script>""", height=0)
+    return "a:" + cid
 
 def add_view_once(share_id: str):
     key = f"__viewed_{share_id}"
     if st.session_state.get(key): return
     st.session_state[key] = True
-    sb = supa()
-    sb.table("views").insert({"share_id": share_id}).execute()
+    view_buffer().add(share_id, viewer=viewer_key())
+    scores().record(share_id, "view")
 
-def get_view_count(share_id: str) -> int:
-    sb = supa()
-    res = sb.table("views").select("share_id", count="exact").eq("share_id", share_id).execute()
-    return res.count or 0
+STATS_TTL = 30
+
+def _stats_keys(share_id: str, email) -> tuple:
+    # liked 는 사용자별 값이라 이메일까지 키에 넣는다 (TTL 안에 로그인/로그아웃해도 남의 상태를 보이지 않게)
+    return f"__stats_{share_id}_{email or ''}", f"__like_{share_id}_{email or ''}"
+
+def get_share_stats(share_id: str) -> dict:
+    # 세션 안에서는 STATS_TTL 동안 재사용 (좋아요/편집 토글 같은 재실행마다 다시 묻지 않는다)
+    user = st.session_state.get("user")
+    email = user.get("email") if user else None
+    key, like_key = _stats_keys(share_id, email)
+    hit = st.session_state.get(key)
+    if hit and time.time() - hit["at"] < STATS_TTL: return hit
+    with metrics.span("engagement.share_stats"):
+        stats = backend().share_stats(share_id, email)
+    stats["views"] += view_buffer().pending(share_id)   # 아직 안 보낸 조회도 바로 보이게
+    viewers = stats.pop("viewers")
+    viewers.add(viewer_key())                            # 지금 보는 사람은 확실히 포함
+    stats["unique"] = viewers.count()
+    stats["at"] = time.time()
+    scores().sync(share_id, stats["likes"], stats["views"])
+    st.session_state[key] = stats
+    st.session_state[like_key] = {"liked": stats["liked"], "likes": stats["likes"]}
+    return stats
+
+def on_like_click(share_id: str, email: str):
+    # 버튼 콜백: 토글 RPC 한 번의 결과(새 상태, 개수)로 세션 상태를 바꾼다. 실패하면 그대로 두고 알린다
+    s = st.session_state[_stats_keys(share_id, email)[1]]
+    try:
+        s["liked"], s["likes"] = toggle_like(share_id, email)
+    except Exception:
+        st.toast(t("like_failed"))
+        return
+    scores().like(share_id, email, s["liked"])
+
+@st.cache_resource(show_spinner=False)
+def comment_cache() -> engagement.CommentCache:
+    return engagement.CommentCache(backend())
 
-def list_comments(share_id: str, limit=100):
-    sb = supa()
-    res = sb.table("comments").select("*").eq("share_id", share_id).order("created_at", desc=True).limit(limit).execute()
-    return res.data or []
+@metrics.timed("engagement.list_comments")
+def list_comments(share_id: str, after_row=None):
+    # 최신 페이지는 공유 캐시에서, after_row 를 주면 그보다 오래된 페이지를 가져온다 -> (rows, has_more)
+    if after_row: return comment_cache().older(share_id, after_row)
+    return comment_cache().newest(share_id)
 
+@metrics.timed("engagement.add_comment")
 def add_comment(share_id: str, email: str, name: str, text: str):
     if not text.strip(): return
-    sb = supa()
-    sb.table("comments").insert({
-        "share_id": share_id,
-        "email": email or None,
-        "name": name or None,
-        "text": text.strip()
-    }).execute()
-
-params = st.experimental_get_query_params()
+    comment_cache().add(share_id, email, name, text.strip())
+    scores().record(share_id, "comment")
+
+params = st.query_params
 if "error" in params:
     st.error(f"Google OAuth error: {params.get('error')} / {params.get('error_description')}")
 
 # =========================
 # --- OAuth (Google)
 # =========================
-from streamlit_oauth import OAuth2Component
-
+@st.cache_resource(show_spinner=False)
 def google_oauth_button():
+    # 컴포넌트는 설정만 들고 있으니 프로세스에서 한 번만 만든다
+    from streamlit_oauth import OAuth2Component
     # 순서대로: client_id, client_secret, authorize_endpoint, token_endpoint,
     #           refresh_token_endpoint, revoke_token_endpoint
     oauth = OAuth2Component(
@@ -115,82 +185,62 @@ def google_oauth_button():
         "https://oauth2.googleapis.com/token",
         "https://oauth2.googleapis.com/token",
         None,
-        
     )
     return oauth, GOOGLE["redirect_uri"]
 
-def oauth_authorize_button(oauth, label: str, redirect_uri: str, key: str):
-    """
-    streamlit-oauth 버전별 authorize_button 시그니처 차이를 흡수해서 안전하게 호출한다.
-    scope는 문자열 우선("openid email profile")로 전달하고, 실패 시 list로 재시도한다.
-    'key'는 반드시 문자열로 보장하며, key 위치가 바뀐 시그니처도 순차적으로 대응한다.
-    """
-    scope_str = "openid email profile"
-    scope_list = ["openid", "email", "profile"]
-
+_SCOPE = "openid email profile"
+_EXTRAS = {"prompt": "select_account"}
+# streamlit-oauth 버전별 authorize_button 호출 방식 -> (args, kwargs). 앞에 있을수록 먼저 시도
+AUTHORIZE_CALLS = [
     # 0) 가장 단순: 필수 3개만 (label, redirect_uri, scope[str])
-    try:
-        return oauth.authorize_button(label, redirect_uri, scope_str)
-    except Exception:
-        pass
-
+    lambda label, ru, key: ((label, ru, _SCOPE), {}),
     # 1) 위치 인자 스타일(일부 버전): (label, redirect_uri, scope, key, use_container_width, extras_params)
-    try:
-        return oauth.authorize_button(label, redirect_uri, scope_str, key, True, {"prompt": "select_account"})
-    except Exception:
-        pass
-
+    lambda label, ru, key: ((label, ru, _SCOPE, key, True, _EXTRAS), {}),
     # 2) 위치 인자 다른 순서 스타일: (label, redirect_uri, scope, use_container_width, key, extras_params)
-    try:
-        return oauth.authorize_button(label, redirect_uri, scope_str, True, key, {"prompt": "select_account"})
-    except Exception:
-        pass
-
+    lambda label, ru, key: ((label, ru, _SCOPE, True, key, _EXTRAS), {}),
     # 3) 키워드 스타일 A
-    try:
-        return oauth.authorize_button(
-            label,
-            redirect_uri=redirect_uri,
-            scope=scope_str,
-            key=key,
-            use_container_width=True,
-            extras_params={"prompt": "select_account"},
-        )
-    except Exception:
-        pass
-
+    lambda label, ru, key: ((label,), dict(redirect_uri=ru, scope=_SCOPE, key=key, use_container_width=True, extras_params=_EXTRAS)),
     # 4) 키워드 스타일 B (scope -> scopes)
-    try:
-        return oauth.authorize_button(
-            label,
-            redirect_uri=redirect_uri,
-            scopes=scope_str,
-            key=key,
-            use_container_width=True,
-            extras_params={"prompt": "select_account"},
-        )
-    except Exception:
-        pass
+    lambda label, ru, key: ((label,), dict(redirect_uri=ru, scopes=_SCOPE, key=key, use_container_width=True, extras_params=_EXTRAS)),
+    # 5) scope를 list로 (일부 포크): 위치 인자 / 키워드
+    lambda label, ru, key: ((label, ru, _SCOPE.split(), key, True, _EXTRAS), {}),
+    lambda label, ru, key: ((label,), dict(redirect_uri=ru, scope=_SCOPE.split(), key=key, use_container_width=True, extras_params=_EXTRAS)),
+]
 
-    # 5) scope를 list로 바꿔 재시도 (일부 포크)
-    for sc in (scope_list,):
-        # 5-1) 위치 인자
-        try:
-            return oauth.authorize_button(label, redirect_uri, sc, key, True, {"prompt": "select_account"})
-        except Exception:
-            pass
-        # 5-2) 키워드
+@st.cache_resource(show_spinner=False)
+def authorize_convention() -> dict:
+    return {"idx": None}   # 이 프로세스에서 처음 성공한 AUTHORIZE_CALLS 번호
+
+def oauth_authorize_button(oauth, label: str, redirect_uri: str, key: str):
+    """
+    streamlit-oauth 버전별 authorize_button 시그니처 차이를 흡수해서 안전하게 호출한다.
+    처음 한 번만 방식을 찾고(시그니처에 안 맞는 방식은 호출하지 않고 건너뜀) 프로세스 전체가 그 방식을 재사용한다.
+    기억한 방식이 실패하면(패키지 교체 등) 다시 찾는다.
+    """
+    memo = authorize_convention()
+    n = len(AUTHORIZE_CALLS)
+    order = list(range(n)) if memo["idx"] is None else [memo["idx"]] + [i for i in range(n) if i != memo["idx"]]
+    sig = None
+    for i in order:
+        args, kwargs = AUTHORIZE_CALLS[i](label, redirect_uri, key)
+        if i != memo["idx"]:
+            if sig is None:
+                import inspect
+                try:
+                    sig = inspect.signature(oauth.authorize_button)
+                except (TypeError, ValueError):
+                    sig = False
+            if sig:
+                try:
+                    sig.bind(*args, **kwargs)
+                except TypeError:
+                    continue
         try:
-            return oauth.authorize_button(
-                label,
-                redirect_uri=redirect_uri,
-                scope=sc,
-                key=key,
-                use_container_width=True,
-                extras_params={"prompt": "select_account"},
-            )
+            res = oauth.authorize_button(*args, **kwargs)
         except Exception:
-            pass
+            continue
+        memo["idx"] = i
+        return res
 
     import inspect
     st.error("`authorize_button` 시그니처를 자동으로 맞출 수 없습니다. 아래 시그니처를 보고 한 줄로 수정해주세요.")
@@ -200,16 +250,84 @@ def oauth_authorize_button(oauth, label: str, redirect_uri: str, key: str):
         st.write("시그니처를 introspect할 수 없습니다. streamlit-oauth 버전을 확인하세요: `pip show streamlit-oauth`")
     st.stop()
 
-def fetch_google_userinfo(access_token: str):
+@st.cache_resource(show_spinner=False)
+def userinfo_cache() -> auth.UserinfoCache:
+    return auth.UserinfoCache()
+
+@metrics.timed("http.google_userinfo")
+def fetch_google_userinfo(access_token: str, expires_in: float = 3600):
+    # 같은 토큰으로는 만료 전까지 다시 묻지 않는다
+    hit = userinfo_cache().get(access_token)
+    if hit: return hit
+    import requests   # 로그인할 때만 필요
     try:
         r = requests.get("https://www.googleapis.com/oauth2/v3/userinfo",
                         headers={"Authorization": f"Bearer {access_token}"}, timeout=6)
         if r.status_code == 200:
-            return r.json()
+            info = r.json()
+            userinfo_cache().put(access_token, info, expires_in)
+            return info
     except Exception:
         pass
     return None
 
+def token_user(token: dict):
+    """OAuth 토큰 응답 -> 사용자 정보. ID 토큰 클레임이 있으면 추가 HTTP 없이 그걸 쓴다."""
+    claims = auth.id_token_claims(token.get("id_token") or "", GOOGLE["client_id"])
+    info = claims or fetch_google_userinfo(token["access_token"], float(token.get("expires_in") or 3600))
+    if not info or not info.get("email"): return None
+    return {"email": info["email"], "name": info.get("name") or info.get("given_name") or "", "picture": info.get("picture")}
+
+# =========================
+# --- Login session cookie
+# =========================
+SESSION_KEY = hmac.new((APP.get("session_secret") or GOOGLE["client_secret"]).encode(), b"wt-session", hashlib.sha256).digest()
+
+def set_session_cookie(value: str, max_age: int):
+    # 다음 렌더에서 심는다 (로그인/로그아웃 직후 st.rerun 으로 이번 출력은 버려지므로).
+    # Streamlit 은 응답 헤더를 못 건드려서 JS(document.cookie)로 심는다 -> HttpOnly 는 불가능하고
+    # (페이지의 스크립트가 읽을 수 있다) Secure 는 페이지가 https 일 때만 붙는다 (http 로컬/devcontainer 에서도 동작).
+    # 그래서 쿠키에는 서명된 세션 id 만 두고, 로그아웃하면 서버 쪽 세션 행을 지워 바로 무효화한다.
+    st.session_state["__sess_cookie"] = (value, max_age)
+
+def flush_session_cookie():
+    pending = st.session_state.pop("__sess_cookie", None)
+    if pending:
+        value, max_age = pending
+        components.html(f"""<script>
+        parent.document.cookie = "{auth.COOKIE}={value}; path=/; max-age={max_age}; SameSite=Lax"
+            + (parent.location.protocol === "https:" ? "; Secure" : "");
+        </script>""", height=0)
+
+def restore_login():
+    # 세션당 한 번: 서명된 쿠키가 가리키는 살아 있는 세션이 있으면 외부 왕복 없이 로그인 상태 복원
+    if st.session_state["user"] or st.session_state.get("__sess_checked"): return
+    st.session_state["__sess_checked"] = True
+    cookies = st.context.cookies
+    sid = auth.verify(cookies.get(auth.COOKIE), SESSION_KEY)
+    if not sid: return
+    with metrics.span("db.get_session"):
+        user = storage.get_session(db(), sid, time.time())
+    if user:
+        st.session_state["user"] = user
+        st.session_state["__sess_id"] = sid
+
+def start_login(user: dict):
+    sid = auth.new_session_id()
+    with metrics.span("db.create_session"):
+        storage.create_session(db(), sid, user, time.time(), auth.SESSION_TTL)
+    st.session_state["user"] = user
+    st.session_state["__sess_id"] = sid
+    set_session_cookie(auth.sign(sid, SESSION_KEY), auth.SESSION_TTL)
+
+def end_login():
+    sid = st.session_state.pop("__sess_id", None)
+    if sid:
+        with metrics.span("db.delete_session"):
+            storage.delete_session(db(), sid)   # 쿠키가 남아 있어도 더는 통하지 않는다
+    st.session_state["user"] = None
+    set_session_cookie("", 0)
+
 # =========================
 # --- i18n (ko/en)
 # =========================
@@ -225,6 +343,8 @@ LANG = {
         "sort": "정렬",
         "sort_recent": "최근 수정",
         "sort_az": "가나다",
+        "sort_trending": "트렌딩",
+        "sort_liked": "좋아요순",
         "share_title": "공유 제목",
         "public": "공개(Discover 노출)",
         "make_link": "🔗 공유 링크 만들기",
@@ -246,6 +366,7 @@ LANG = {
         "like": "좋아요",
         "likes": "좋아요",
         "views": "조회수",
+        "unique_viewers": "순 방문자",
         "comment": "댓글",
         "add_comment": "댓글 남기기",
         "placeholder_comment": "응원/후기를 적어주세요",
@@ -253,6 +374,25 @@ LANG = {
         "edit_mode": "편집 모드",
         "preview": "미리보기",
         "create_share_success": "공유 링크가 생성됐어요!",
+        "load_more": "더 보기",
+        "like_failed": "좋아요를 반영하지 못했어요. 잠시 후 다시 눌러 주세요.",
+        "import_export": "📦 가져오기 / 내보내기",
+        "import_file": "CSV 또는 JSON 파일 (title, link, note 열)",
+        "import_run": "가져오기",
+        "import_done": "{added}개 추가 · 중복 {duplicate}개 · 빈 행 {invalid}개 건너뜀",
+        "import_error": "파일을 읽지 못했어요: {err}",
+        "export": "📤 내보내기",
+        "export_format": "형식",
+        "export_ready": "⬇️ 파일 받기",
+        "metrics": "성능 계측",
+        "metrics_off": "계측이 꺼져 있어요. secrets 의 [app] metrics = true 로 켜세요.",
+        "reset": "초기화",
+        "edit_conflict": "편집하는 동안 다른 사람이 이 공유를 먼저 저장했어요. 최신 내용을 불러온 뒤 다시 고쳐 주세요.",
+        "reload_latest": "최신 내용 불러오기 (내 변경 버림)",
+        "page": "페이지",
+        "load_older": "이전 댓글 더 보기",
+        "search": "검색",
+        "placeholder_search": "공유 제목, 웹툰 제목, 메모로 검색",
     },
     "en": {
         "app_title": "Webtoon Share List",
@@ -264,6 +404,8 @@ LANG = {
         "sort": "Sort",
         "sort_recent": "Recently updated",
         "sort_az": "A–Z",
+        "sort_trending": "Trending",
+        "sort_liked": "Most liked",
         "share_title": "Share title",
         "public": "Public (show in Discover)",
         "make_link": "🔗 Create share link",
@@ -285,6 +427,7 @@ LANG = {
         "like": "Like",
         "likes": "Likes",
         "views": "Views",
+        "unique_viewers": "Unique viewers",
         "comment": "Comments",
         "add_comment": "Add a comment",
         "placeholder_comment": "Leave a message",
@@ -292,6 +435,25 @@ LANG = {
         "edit_mode": "Edit mode",
         "preview": "Preview",
         "create_share_success": "Share link created!",
+        "load_more": "Load more",
+        "like_failed": "Could not update your like. Please try again.",
+        "import_export": "📦 Import / Export",
+        "import_file": "CSV or JSON file (title, link, note columns)",
+        "import_run": "Import",
+        "import_done": "Added {added} · skipped {duplicate} duplicates and {invalid} empty rows",
+        "import_error": "Could not read the file: {err}",
+        "export": "📤 Export",
+        "export_format": "Format",
+        "export_ready": "⬇️ Download",
+        "metrics": "Timings",
+        "metrics_off": "Instrumentation is off. Enable it with metrics = true under [app] in secrets.",
+        "reset": "Reset",
+        "edit_conflict": "Someone else saved this share while you were editing. Reload the latest version and reapply your changes.",
+        "reload_latest": "Reload latest (discard my changes)",
+        "page": "Page",
+        "load_older": "Load older comments",
+        "search": "Search",
+        "placeholder_search": "Search share titles, webtoon titles and notes",
     }
 }
 def t(key): return LANG[st.session_state["__lang"]].get(key, key)
@@ -300,10 +462,8 @@ def t(key): return LANG[st.session_state["__lang"]].get(key, key)
 # --- Session Defaults
 # =========================
 st.session_state.setdefault("user", None)       # {"email","name","picture"}
-st.session_state.setdefault("my_list", [])      # [{title,link,note,updated_at}]
 st.session_state.setdefault("sort_mode", "최근 수정")
 st.session_state.setdefault("__theme", "시스템")  # 시스템/라이트/다크
-st.session_state.setdefault("__discover_cache_at", 0.0)
 
 # =========================
 # --- Util
@@ -311,58 +471,52 @@ st.session_state.setdefault("__discover_cache_at", 0.0)
 def now_iso(): return datetime.now().isoformat(timespec="seconds")
 
 def norm_item(i):
+    i.setdefault("id", uuid.uuid4().hex[:12])   # 위젯/편집 diff 용 고정 id
     i.setdefault("title","")
     i.setdefault("link","")
     i.setdefault("note","")
     i.setdefault("updated_at", now_iso())
     return i
 
-def save_to_db(share_id, owner_email, owner_name, title, data_list, is_public: bool):
-    conn = db()
-    payload = json.dumps([norm_item(x) for x in data_list], ensure_ascii=False)
-    tnow = now_iso()
-    if share_id:
-        conn.execute("UPDATE shares SET title=?, data_json=?, is_public=?, updated_at=? WHERE id=?",
-                    (title, payload, 1 if is_public else 0, tnow, share_id))
-    else:
-        share_id = uuid.uuid4().hex[:12]
-        conn.execute("""INSERT INTO shares(id, owner_email, owner_name, title, data_json, is_public, created_at, updated_at)
-                        VALUES (?,?,?,?,?,?,?,?)""",
-                    (share_id, owner_email, owner_name, title, payload, 1 if is_public else 0, tnow, tnow))
-    conn.commit()
-    return share_id
-
-def load_share(share_id):
-    conn = db()
-    cur = conn.execute("SELECT id, owner_email, owner_name, title, data_json, is_public, created_at, updated_at FROM shares WHERE id=?", (share_id,))
-    row = cur.fetchone()
-    if not row: return None
-    return {
-        "id": row[0],
-        "owner_email": row[1],
-        "owner_name": row[2],
-        "title": row[3],
-        "data": json.loads(row[4] or "[]"),
-        "is_public": bool(row[5]),
-        "created_at": row[6],
-        "updated_at": row[7],
-    }
+@metrics.timed("db.save_share")
+def save_to_db(share_id, owner_email, owner_name, title, data_list, is_public: bool, version=None):
+    # version 을 주면 그 사이 다른 사람이 저장했을 때 storage.ShareConflict
+    try:
+        return storage.save_share(db(), share_id, owner_email, owner_name, title,
+                                  [norm_item(x) for x in data_list], is_public, now_iso(), version)
+    finally:
+        if share_id: share_cache().invalidate(share_id)
 
-def discover_public(limit=100):
-    conn = db()
-    cur = conn.execute("""
-        SELECT id, owner_name, title, updated_at
-        FROM shares WHERE is_public=1
-        ORDER BY updated_at DESC
-        LIMIT ?
-    """, (limit,))
-    return [{"id":r[0], "owner_name":r[1], "title":r[2], "updated_at":r[3]} for r in cur.fetchall()]
-
-def sort_list(lst, mode):
-    if mode in ("최근 수정","Recently updated"):
-        lst.sort(key=lambda x: x.get("updated_at",""), reverse=True)
-    else:
-        lst.sort(key=lambda x: (x.get("title") or "").lower())
+@metrics.timed("db.load_share")
+def load_share(share_id, limit=-1):
+    share = share_cache().get(share_id)
+    if not share: return None
+    return dict(share, data=load_items(share_id, 0, limit) if limit else [])
+
+@metrics.timed("db.load_items")
+def load_items(share_id, offset=0, limit=-1):
+    return share_cache().items(share_id, offset, limit)
+
+@metrics.timed("db.discover")
+def discover_public(limit=100, cursor=None, sort="recent"):
+    return storage.discover_public(db(), limit, cursor, sort)
+
+DISCOVER_PAGE = 30
+
+@st.cache_data(show_spinner=False, ttl=10)
+def discover_first_page(sort="recent"):
+    # 첫 페이지는 모든 세션이 공유 (짧은 TTL)
+    return discover_public(DISCOVER_PAGE, sort=sort)
+
+SEARCH_PAGE = 20
+
+@st.cache_data(show_spinner=False, ttl=30)
+@metrics.timed("db.search")
+def search_shares(q: str, page: int):
+    return storage.search_public(db(), q, SEARCH_PAGE, page * SEARCH_PAGE)
+
+def list_sort(mode) -> str:
+    return "recent" if mode in ("최근 수정","Recently updated") else "az"
 
 def touch_item(it): it["updated_at"] = now_iso()
 
@@ -372,21 +526,6 @@ def normalize_link(url: str) -> str:
         url = "http://" + url
     return url
 
-@st.cache_data(show_spinner=False, ttl=60*60)
-def fetch_og_thumb(url: str, timeout=4.0):
-    try:
-        if not url: return ""
-        headers = {"User-Agent": "Mozilla/5.0 (WebtoonShare/1.0)", "Accept-Language":"ko-KR,ko;q=0.9,en-US;q=0.8"}
-        r = requests.get(url, headers=headers, timeout=timeout)
-        if r.status_code != 200: return ""
-        soup = BeautifulSoup(r.text, "html.parser")
-        tag = soup.select_one('meta[property="og:image"], meta[name="twitter:image"]')
-        img = (tag.get("content") if tag else "") or ""
-        if img.startswith("//"): img = "https:" + img
-        return img
-    except Exception:
-        return ""
-
 def can_edit_share(data) -> bool:
     user = st.session_state.get("user")
     admin = APP.get("admin_email")
@@ -413,6 +552,12 @@ st.markdown("""
 .item-card{ border:1px solid var(--border); border-radius:10px; padding:8px 10px; margin-bottom:8px; background:var(--card); box-shadow:var(--shadow); }
 .item-row{ display:flex; align-items:center; gap:8px; flex-wrap:wrap; }
 .item-small{ font-size:.8rem; color:var(--muted); }
+.cards .item-card{ display:flex; align-items:center; gap:12px; }
+.cards .item-main{ flex:1; min-width:0; }
+.cards .item-main b{ display:block; overflow-wrap:anywhere; }
+.cards .item-thumb{ width:100px; height:auto; border-radius:6px; flex:none; }
+.cards .item-btn{ flex:none; border:1px solid var(--border); border-radius:8px; padding:.3rem .8rem; color:var(--text); text-decoration:none; white-space:nowrap; }
+.cards .item-btn:hover{ filter:brightness(1.1); }
 .floatWrap{ position:fixed; right:16px; bottom:16px; z-index:9999; display:flex; flex-direction:column; gap:8px }
 .floatBtn{ background:var(--card); color:var(--text); border:1px solid var(--border); border-radius:999px; padding:.5rem .8rem; box-shadow:var(--shadow); cursor:pointer }
 .floatBtn:hover{ filter:brightness(1.05); }
@@ -421,6 +566,8 @@ st.markdown("""
 
 def theme_toggle():
     # 언어/테마/로그인 바
+    restore_login()
+    flush_session_cookie()
     top = st.container()
     with top:
         c1,c2,c3,c4 = st.columns([3,2,3,2])
@@ -437,22 +584,22 @@ def theme_toggle():
                 u = st.session_state["user"]
                 st.write(f"👤 {u.get('name','')} ({u.get('email','')})")
                 if st.button(t("logout")):
-                    st.session_state["user"] = None
-                    st.experimental_set_query_params()
+                    end_login()
+                    st.query_params.clear()
                     st.rerun()
             else:
                 oauth, redirect_uri = google_oauth_button()
                 result = oauth_authorize_button(oauth, t("login_google"), redirect_uri, "google_btn")
 
                 if result and "token" in result:
-                    token = result["token"]
-                    info = fetch_google_userinfo(token["access_token"])
-                    if info:
-                        st.session_state["user"] = {
-                            "email": info.get("email"),
-                            "name": info.get("name") or info.get("given_name") or "",
-                            "picture": info.get("picture"),
-                        }
+                    user = token_user(result["token"])
+                    if user:
+                        anon = viewer_key()
+                        start_login(user)
+                        # 로그인 전에 익명으로 담아둔 목록은 계정으로 옮긴다
+                        list_writer().flush(anon)
+                        with metrics.span("db.claim_user_items"):
+                            storage.claim_user_items(db(), anon, viewer_key())
                         st.success("Login success!")
                         st.rerun()
 
@@ -483,59 +630,179 @@ float_scroll_buttons()
 # =========================
 # --- My List Page
 # =========================
-st.session_state.setdefault("my_list", [])
+MY_PAGE = 50
+
+def _cell(v) -> str:
+    return v.strip() if isinstance(v, str) else ""   # data_editor 빈 칸은 None/NaN
+
+def my_list_total(owner: str) -> int:
+    # 개수는 (owner, 버전) 이 바뀔 때만 다시 센다. 읽기 전에 이 사용자의 밀린 쓰기를 먼저 내려보낸다
+    key = (owner, st.session_state.get("__my_ver", 0))
+    cur = st.session_state.get("__my_total")
+    if not cur or cur[0] != key:
+        with metrics.span("db.user_items_count"):
+            list_writer().flush(owner)
+            cur = st.session_state["__my_total"] = (key, storage.count_user_items(db(), owner))
+    return cur[1]
+
+def my_list_page(owner: str, sort: str, page: int):
+    """지금 보이는 한 페이지만 세션에 둔다. (owner, 정렬, 페이지, 버전) 이 바뀔 때만 다시 읽는다."""
+    key = (owner, sort, page, st.session_state.get("__my_ver", 0))
+    view = st.session_state.get("__my_view")
+    if not view or view[0] != key:
+        with metrics.span("db.user_items_page"):
+            list_writer().flush(owner)
+            view = st.session_state["__my_view"] = (key, storage.load_user_items(db(), owner, sort, (page - 1) * MY_PAGE, MY_PAGE))
+    return view[1]
+
+def apply_my_list_edits(owner: str, rows, edited):
+    """편집기 한 페이지(rows) 와 제출된 표(edited) 를 id 로 비교해서 바뀐 것만 쓰기 버퍼에 넣는다."""
+    w = list_writer()
+    before = {it["id"]: it for it in rows}
+    kept = set()
+    for r in edited.to_dict("records"):
+        title, link, note = _cell(r.get("title")), normalize_link(_cell(r.get("link"))), _cell(r.get("note"))
+        it = before.get(r.get("id"))
+        if it:
+            kept.add(it["id"])
+            if (it["title"], it["link"], it["note"]) != (title, link, note):
+                w.put(owner, dict(it, title=title, link=link, note=note, updated_at=now_iso()))
+        elif title or link or note:
+            w.put(owner, norm_item({"title": title, "link": link, "note": note}))
+    for item_id in set(before) - kept:
+        w.delete(owner, item_id)
+
+IMPORT_BATCH = 500
+
+@metrics.timed("db.import_items")
+def import_items(owner: str, rows) -> dict:
+    """
+    rows(iterator)를 IMPORT_BATCH 개씩 검증 -> 중복 검사 -> 한 트랜잭션으로 저장한다. 앞 배치가 커밋된 뒤에
+    다음 배치를 검사하므로 파일 안에서 겹치는 것도 인덱스로 걸러지고, 메모리에는 배치 하나만 남는다.
+    """
+    list_writer().flush(owner)   # 버퍼에 남은 편집도 중복 검사에 보이도록
+    n = {"added": 0, "duplicate": 0, "invalid": 0}
+    for batch in listio.batched(rows, IMPORT_BATCH):
+        items = []
+        for r in batch:
+            title, link = _cell(r.get("title")), normalize_link(_cell(r.get("link")))
+            if not title and not link:
+                n["invalid"] += 1; continue
+            items.append(norm_item({"title": title, "link": link, "note": _cell(r.get("note"))}))
+        new = [it for it, dup in zip(items, storage.user_duplicates(db(), owner, items)) if not dup]
+        storage.apply_user_ops(db(), [(owner, it["id"], it) for it in new])
+        n["added"] += len(new)
+        n["duplicate"] += len(items) - len(new)
+    return n
+
+EXPORT_DIR = os.path.join(APP_DIR, "static", "exports")
+EXPORT_TTL = 10*60   # 내보낸 파일은 이 시간 동안만 받을 수 있다
+
+def _sweep_exports(now: float):
+    try: names = os.listdir(EXPORT_DIR)
+    except FileNotFoundError: return
+    for n in names:
+        d = os.path.join(EXPORT_DIR, n)
+        try:
+            if now - os.path.getmtime(d) > EXPORT_TTL: shutil.rmtree(d, ignore_errors=True)
+        except OSError: pass
+
+def export_button(key: str, filename: str, items_fn):
+    """
+    누를 때만 items_fn() 을 배치로 읽어 static/exports/<임의 토큰>/ 에 흘려 쓰고 그 정적 파일 링크를 준다.
+    st.download_button 은 파일 전체를 메모리에 올려 세션으로 보내므로 쓰지 않는다 - 정적 파일은 서버가
+    조각으로 보낸다. 토큰을 아는 사람만 받을 수 있고 EXPORT_TTL 이 지나면 다음 내보내기 때 지워진다.
+    """
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        fmt = st.radio(t("export_format"), ["csv", "json"], horizontal=True, key=f"{key}_fmt")
+    with c2:
+        if st.button(t("export"), key=key, use_container_width=True):
+            now = time.time()
+            _sweep_exports(now)
+            token, name = uuid.uuid4().hex, f"{filename}.{fmt}"
+            d = os.path.join(EXPORT_DIR, token)
+            os.makedirs(d)
+            with metrics.span("db.export"):
+                os.replace(listio.export_file(items_fn(), fmt, d), os.path.join(d, name))
+            st.markdown(f'<a href="app/static/exports/{token}/{html.escape(name)}" download="{html.escape(name)}">'
+                        f'{t("export_ready")}</a>', unsafe_allow_html=True)
+
+def my_list_import_export(owner: str):
+    with st.expander(t("import_export")):
+        up = st.file_uploader(t("import_file"), type=["csv", "json", "jsonl"], key=f'__import_{st.session_state.get("__my_ver", 0)}')
+        if up is not None and st.button(t("import_run"), key="__import_run"):
+            try:
+                n = import_items(owner, listio.iter_items(up, up.name))
+                st.session_state["__import_msg"] = ("success", t("import_done").format(**n))
+            except listio.FormatError as e:   # 오류 전까지의 배치는 이미 저장됐다
+                st.session_state["__import_msg"] = ("error", t("import_error").format(err=e))
+            st.session_state["__my_ver"] = st.session_state.get("__my_ver", 0) + 1   # 목록 다시 읽고 업로더 비움
+            st.rerun()
+        if msg := st.session_state.pop("__import_msg", None):
+            getattr(st, msg[0])(msg[1])
+        st.divider()
+        def items():
+            list_writer().flush(owner)
+            return storage.iter_user_items(db(), owner, list_sort(st.session_state["sort_mode"]))
+        export_button("__export_my", "my-webtoons", items)
+
 def page_my_list():
+    import pandas as pd   # 표 편집기에서만 쓴다 (공유 페이지 재실행은 안 불러옴)
     st.subheader(t("my_list"))
+    owner = viewer_key()
     c1,c2,c3,c4 = st.columns([2,2,3,3])
+    with c2:
+        st.session_state["sort_mode"] = st.selectbox(t("sort"), [t("sort_recent"), t("sort_az")], index=0 if st.session_state["sort_mode"] in ("최근 수정","Recently updated") else 1)
+    sort = list_sort(st.session_state["sort_mode"])
     with c1:
         if st.button(t("add_item")):
-            st.session_state["my_list"].append(norm_item({"title":"","link":"","note":""}))
+            list_writer().put(owner, norm_item({"title":"","link":"","note":""}))
+            st.session_state["__my_ver"] = st.session_state.get("__my_ver", 0) + 1
             st.rerun()
-    with c2:
-        st.session_state["sort_mode"] = st.selectbox(t("sort"), [t("sort_recent"), t("sort_az")], index=0 if st.session_state["sort_mode"] in ("최근 수정","Recently updated") else 1)
     with c3:
         share_title = st.text_input(t("share_title"), value="내가 좋아하는 웹툰" if st.session_state["__lang"]=="ko" else "My favorite webtoons")
     with c4:
         pub = st.toggle(t("public"), value=True)
+    my_list_import_export(owner)
     st.divider()
 
-    lst = st.session_state["my_list"]
-    sort_list(lst, st.session_state["sort_mode"])
-    trash = []
-    for i, it in enumerate(lst):
-        st.markdown('<div class="item-card">', unsafe_allow_html=True)
-        r1,r2,r3,r4,r5 = st.columns([3,4,3,1,1])
-        with r1:
-            new_title = st.text_input(t("title"), value=it["title"], key=f"t_{i}")
-            if new_title != it["title"]:
-                it["title"] = new_title; touch_item(it)
-        with r2:
-            new_link = st.text_input(t("link"), value=it["link"], key=f"l_{i}", placeholder="https://...")
-            if new_link != it["link"]:
-                it["link"] = normalize_link(new_link); touch_item(it)
-        with r3:
-            new_note = st.text_input(t("note"), value=it["note"], key=f"n_{i}")
-            if new_note != it["note"]:
-                it["note"] = new_note; touch_item(it)
-        with r4:
-            if it["link"]: st.link_button(t("open"), it["link"])
-            else: st.caption("—")
-        with r5:
-            if st.button("🗑", key=f"d_{i}"): trash.append(i)
-        st.caption(f"{t('updated')}: {it['updated_at']}")
-        st.markdown('</div>', unsafe_allow_html=True)
-    for idx in reversed(trash): st.session_state["my_list"].pop(idx)
+    # 한 페이지(MY_PAGE 개)만 읽어서 표 편집기로 보내고, 제출할 때 한 번에 diff 로 반영한다
+    pages = max(1, math.ceil(my_list_total(owner) / MY_PAGE))
+    page = st.number_input(t("page"), min_value=1, max_value=pages, value=1, step=1, key="__my_page") if pages > 1 else 1
+    rows = my_list_page(owner, sort, page)
+    ver = st.session_state.get("__my_ver", 0)
+    with st.form("__my_form"):
+        edited = st.data_editor(
+            pd.DataFrame(rows, columns=["id", "title", "link", "note", "updated_at"]),
+            key=f"__my_editor_{ver}_{page}",
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "id": None,
+                "title": st.column_config.TextColumn(t("title")),
+                "link": st.column_config.LinkColumn(t("link")),
+                "note": st.column_config.TextColumn(t("note")),
+                "updated_at": st.column_config.TextColumn(t("updated"), disabled=True),
+            },
+        )
+        if st.form_submit_button(t("save_changes")):
+            apply_my_list_edits(owner, rows, edited)
+            st.session_state["__my_ver"] = ver + 1   # 다시 읽고 편집기 위젯 상태도 초기화
+            st.rerun()
 
     st.divider()
     if st.session_state["user"]:
         if st.button(t("make_link"), use_container_width=True):
             u = st.session_state["user"]
+            list_writer().flush(owner)
             sid = save_to_db(
                 share_id=None,
                 owner_email=u["email"],
                 owner_name=u["name"],
                 title=share_title.strip() or ("내가 좋아하는 웹툰" if st.session_state["__lang"]=="ko" else "My favorite webtoons"),
-                data_list=st.session_state["my_list"],
+                data_list=storage.load_user_items(db(), owner, sort),
                 is_public=pub,
             )
             base = GOOGLE.get("redirect_uri", "http://localhost:8501")
@@ -546,140 +813,284 @@ def page_my_list():
         st.info(t("need_login"))
 
 # =========================
-# --- Share View (Read / Edit if owner/admin) + Like/View/Comments
+# --- Read-only cards
 # =========================
-def page_share_view(share_id: str):
-    data = load_share(share_id)
-    if not data:
-        st.error(t("not_found")); return
+# 읽기 전용 목록은 카드 전체를 이스케이프한 HTML 한 덩어리로 그린다: 항목 수와 상관없이 요소 하나라서
+# 웹소켓으로 가는 델타 수가 일정하고, 썸네일은 브라우저가 화면에 가까워질 때 받아온다 (loading="lazy").
+def _href(url: str) -> str:
+    return _esc(url) if url.startswith(("http://", "https://")) else ""
 
-    add_view_once(share_id)
+def thumb_src(thumb: str) -> str:
+    """cached_images 결과 -> <img src>. 로컬 축소본은 정적 파일 경로(app/static/...), 원격은 그대로."""
+    if not thumb or thumb.startswith(("http://", "https://")): return thumb
+    rel = os.path.relpath(os.path.abspath(thumb), APP_DIR).replace(os.sep, "/")
+    return "app/" + rel if rel.startswith("static/") else ""
 
-    st.subheader(f'{t("share")}: {data["title"]}')
-    st.caption(f'{t("by")} {data.get("owner_name","?")} · {data.get("updated_at","")}')
-    like_col, view_col, edit_col = st.columns([1,1,2])
+def _esc(s: str) -> str:
+    # 빈 줄이 끼면 마크다운 HTML 블록이 거기서 끝나 버리므로 줄바꿈도 태그로
+    return html.escape(s).replace("\n", "<br>")
+
+def card_html(title: str, sub: str = "", note: str = "", href: str = "", label: str = "", img: str = "") -> str:
+    e = _esc
+    out = ['<div class="item-card"><div class="item-main"><b>', e(title or "(No title)"), "</b>"]
+    if note: out += ['<div class="item-small">', e(note), "</div>"]
+    if sub: out += ['<div class="item-small">', e(sub), "</div>"]
+    out.append("</div>")
+    if img: out += ['<img class="item-thumb" loading="lazy" decoding="async" referrerpolicy="no-referrer" alt="', e(t("preview")), '" src="', e(img), '">']
+    if _href(href): out += ['<a class="item-btn" target="_blank" rel="noopener noreferrer" href="', _href(href), '">', e(label), "</a>"]
+    else: out.append('<span class="item-small">—</span>')
+    out.append("</div>")
+    return "".join(out)
 
+def share_card(it: dict, thumb: str = "") -> str:
+    return card_html(it.get("title", ""), f'{t("updated")}: {it.get("updated_at", "")}', it.get("note", ""),
+                     it.get("link", ""), t("open"), thumb_src(thumb))
+
+def render_cards(cards):
+    # 줄바꿈/들여쓰기 없이 이어 붙여야 마크다운이 HTML 블록 중간을 코드나 문단으로 끊지 않는다
+    st.markdown('<div class="cards">' + "".join(cards) + "</div>", unsafe_allow_html=True)
+
+# =========================
+# --- Share View (Read / Edit if owner/admin) + Like/View/Comments
+# =========================
+ITEM_PAGE = 50
+
+# 공유 페이지는 조각(fragment)별로 따로 재실행된다: 좋아요를 누르거나 댓글을 달아도
+# 그 조각만 다시 돌고 load_share/썸네일/댓글 조회는 반복되지 않는다.
+@st.fragment
+def share_stats_bar(share_id: str):
+    stats = get_share_stats(share_id)
+    like_col, view_col = st.columns([1,1])
     with like_col:
-        lc = get_like_count(share_id)
         user = st.session_state.get("user")
-        liked = user and has_liked(share_id, user.get("email"))
-        label = f'❤️ {t("likes")} {lc}' if liked else f'🤍 {t("likes")} {lc}'
-        if user and st.button(label, key="like_btn"):
-            toggle_like(share_id, user.get("email")); st.rerun()
-        elif not user:
+        like = st.session_state[_stats_keys(share_id, user.get("email") if user else None)[1]]
+        lc = like["likes"]
+        label = f'❤️ {t("likes")} {lc}' if user and like["liked"] else f'🤍 {t("likes")} {lc}'
+        if user:
+            st.button(label, key="like_btn", on_click=on_like_click, args=(share_id, user.get("email")))
+        else:
             st.caption(f'🤍 {t("likes")} {lc}')
     with view_col:
-        vc = get_view_count(share_id)
-        st.caption(f'👁 {t("views")} {vc}')
-    with edit_col:
-        editable = can_edit_share(data)
-        if editable:
-            st.toggle(t("edit_mode"), key="__share_edit", value=bool(st.session_state.get("__share_edit")))
-        else:
-            st.caption("")
+        st.caption(f'👁 {t("views")} {stats["views"]} · 👤 {t("unique_viewers")} {stats["unique"]}')
 
-    st.divider()
+@st.fragment
+def share_item_list(share_id: str, total: int):
+    shown_key = f"__items_shown_{share_id}"
+    items = load_items(share_id, 0, st.session_state.get(shown_key, ITEM_PAGE))
+    # 썸네일은 워커(linkmeta.py)가 미리 채워둔 것만 쓴다: 렌더 중에는 네트워크를 타지 않는다
+    with metrics.span("db.link_meta"):
+        thumbs = linkmeta.cached_images(db(), (it.get("link","") for it in items))
+    render_cards(share_card(it, thumbs.get(it.get("link", ""), "")) for it in items)
+    if len(items) < total:
+        if st.button(f'{t("load_more")} ({len(items)}/{total})', key="__items_more", use_container_width=True):
+            st.session_state[shown_key] = len(items) + ITEM_PAGE
+            st.rerun(scope="fragment")
 
-    # 본문
-    items = data["data"]
-    changed = False
+@st.fragment
+def share_editor(data):
+    # 편집 중인 목록은 세션에 들고 있고(_k: 위젯용 고정 키), 저장할 때만 DB 로 간다
+    # 편집을 시작한 시점의 version 도 같이 들고 있다가 저장할 때 조건으로 건다
+    key = f"__edit_items_{data['id']}"
+    if key not in st.session_state:
+        base = load_share(data["id"]) or data
+        st.session_state[key] = {"version": base["version"], "items": [dict(it, _k=uuid.uuid4().hex[:8]) for it in base["data"]]}
+    items = st.session_state[key]["items"]
     for i, it in enumerate(items):
+        k = it["_k"]
         st.markdown('<div class="item-card">', unsafe_allow_html=True)
-        c1,c2,c3,c4 = st.columns([4,3,3,2])
-        if st.session_state.get("__share_edit", False) and editable:
-            new_title = st.text_input(t("title"), value=it.get("title",""), key=f"e_t_{i}")
-            new_link  = st.text_input(t("link"), value=it.get("link",""), key=f"e_l_{i}", placeholder="https://...")
-            new_note  = st.text_input(t("note"), value=it.get("note",""), key=f"e_n_{i}")
-            if new_title != it.get("title") or new_link != it.get("link") or new_note != it.get("note"):
-                items[i]["title"] = new_title
-                items[i]["link"] = normalize_link(new_link)
-                items[i]["note"] = new_note
-                items[i]["updated_at"] = now_iso()
-                changed = True
-            with c4:
-                if st.button("🗑", key=f"e_d_{i}"):
-                    items.pop(i); changed = True; st.rerun()
-        else:
-            with c1:
-                st.write(f"**{it.get('title','(No title)')}**")
-                if it.get("note"): st.caption(it["note"])
-            with c2:
-                if it.get("link"): st.link_button(t("open"), it["link"])
-                else: st.caption("—")
-            with c3:
-                thumb = fetch_og_thumb(it.get("link",""))
-                if thumb: st.image(thumb, width=100, caption=t("preview"))
-            with c4:
-                st.caption(f'{t("updated")}: {it.get("updated_at","")}')
+        c1,c4 = st.columns([10,2])
+        with c1:
+            new_title = st.text_input(t("title"), value=it.get("title",""), key=f"e_t_{k}")
+            new_link  = st.text_input(t("link"), value=it.get("link",""), key=f"e_l_{k}", placeholder="https://...")
+            new_note  = st.text_input(t("note"), value=it.get("note",""), key=f"e_n_{k}")
+        if new_title != it.get("title") or normalize_link(new_link) != it.get("link") or new_note != it.get("note"):
+            it["title"] = new_title
+            it["link"] = normalize_link(new_link)
+            it["note"] = new_note
+            it["updated_at"] = now_iso()
+        with c4:
+            if st.button("🗑", key=f"e_d_{k}"):
+                items.pop(i)
+                st.rerun(scope="fragment")
         st.markdown('</div>', unsafe_allow_html=True)
 
-    if st.session_state.get("__share_edit", False) and editable:
-        st.divider()
-        new_title = st.text_input(t("share_title"), value=data["title"], key="__share_title_edit")
-        new_public = st.toggle(t("public"), value=bool(data.get("is_public")), key="__share_public_edit")
-        if st.button(t("save_changes")):
+    st.divider()
+    new_title = st.text_input(t("share_title"), value=data["title"], key="__share_title_edit")
+    new_public = st.toggle(t("public"), value=bool(data.get("is_public")), key="__share_public_edit")
+    if st.button(t("save_changes")):
+        try:
             sid = save_to_db(
                 share_id=data["id"],
                 owner_email=data["owner_email"],
                 owner_name=data["owner_name"],
                 title=new_title.strip() or data["title"],
-                data_list=items,
-                is_public=new_public
+                data_list=[{k: v for k, v in it.items() if k != "_k"} for it in items],
+                is_public=new_public,
+                version=st.session_state[key]["version"],
             )
+        except storage.ShareConflict:
+            st.session_state[f"__edit_conflict_{data['id']}"] = True
+        else:
+            del st.session_state[key]
             st.success("Saved!")
-            st.experimental_set_query_params(share=sid)
+            st.query_params.from_dict({"share": sid})
+            st.rerun()
+    if st.session_state.get(f"__edit_conflict_{data['id']}"):
+        # 내 편집은 그대로 두고, 최신 내용을 다시 불러올지 고르게 한다
+        st.error(t("edit_conflict"))
+        if st.button(t("reload_latest"), key="__edit_reload"):
+            del st.session_state[key], st.session_state[f"__edit_conflict_{data['id']}"]
             st.rerun()
 
-    # 댓글
-    st.divider()
+@st.fragment
+def share_comments(share_id: str):
     st.markdown(f"#### {t('comment')}")
     if st.session_state.get("user"):
         txt = st.text_input(t("add_comment"), key="__c_new", placeholder=t("placeholder_comment"))
         if st.button("➤", key="__c_send") and txt.strip():
             u = st.session_state["user"]
-            add_comment(data["id"], u.get("email"), u.get("name"), txt.strip())
-            st.rerun()
+            add_comment(share_id, u.get("email"), u.get("name"), txt.strip())
+            st.rerun(scope="fragment")
     else:
         st.info(t("need_login"))
 
-    for cm in list_comments(data["id"], limit=100):
+    comments, has_more = list_comments(share_id)
+    older = st.session_state.setdefault(f"__c_older_{share_id}", {"rows": [], "more": None})
+    if older["rows"]:
+        seen = {cm["id"] for cm in comments}
+        comments = comments + [cm for cm in older["rows"] if cm["id"] not in seen]
+        has_more = older["more"]
+    for cm in comments:
         st.markdown('<div class="item-card">', unsafe_allow_html=True)
         st.write(f"**{cm.get('name') or cm.get('email') or 'Guest'}** · {cm['created_at']}")
         st.write(cm["text"])
         st.markdown('</div>', unsafe_allow_html=True)
+    if has_more and st.button(t("load_older"), key="__c_older", use_container_width=True):
+        rows, older["more"] = list_comments(share_id, after_row=comments[-1])
+        # 지금 보이는 것까지 통째로 들고 있어야 최신 페이지가 밀려도 중간이 비지 않는다
+        older["rows"] = comments + rows
+        st.rerun(scope="fragment")
 
-    # 내 목록 담기
-    st.divider()
+@st.fragment
+def share_import_button(share_id: str):
     if st.session_state["user"]:
         if st.button(t("copy_to_me"), use_container_width=True):
-            exist = {x["title"] for x in st.session_state["my_list"]}
-            for it in items:
-                if it["title"] in exist: continue
-                st.session_state["my_list"].append(norm_item({"title": it["title"], "link": it["link"], "note": it["note"]}))
-            st.success("Imported!")
+            # 링크/제목 인덱스로 중복을 거르고 배치 단위로 바로 저장
+            n = import_items(viewer_key(), storage.iter_share_items(db(), share_id))
+            st.session_state["__my_ver"] = st.session_state.get("__my_ver", 0) + 1
+            st.success(t("import_done").format(**n))
     else:
         st.info(t("need_login"))
 
+def page_share_view(share_id: str):
+    data = load_share(share_id, limit=0)
+    if not data:
+        st.error(t("not_found")); return
+
+    add_view_once(share_id)
+
+    st.subheader(f'{t("share")}: {data["title"]}')
+    st.caption(f'{t("by")} {data.get("owner_name","?")} · {data.get("updated_at","")}')
+    stats_col, edit_col = st.columns([2,2])
+    with stats_col:
+        share_stats_bar(share_id)
+    with edit_col:
+        editable = can_edit_share(data)
+        if editable:
+            st.toggle(t("edit_mode"), key="__share_edit", value=bool(st.session_state.get("__share_edit")))
+        else:
+            st.caption("")
+    editing = st.session_state.get("__share_edit", False) and editable
+
+    st.divider()
+    if editing:
+        share_editor(data)
+    else:
+        st.session_state.pop(f"__edit_items_{share_id}", None)   # 편집을 끄면 저장 안 한 변경은 버린다
+        st.session_state.pop(f"__edit_conflict_{share_id}", None)
+        share_item_list(share_id, data["item_count"])
+
+    st.divider()
+    share_comments(share_id)
+
+    # 내 목록 담기 / 내보내기
+    st.divider()
+    share_import_button(share_id)
+    export_button("__export_share", f"share-{share_id}", lambda: storage.iter_share_items(db(), share_id))
+
 # =========================
 # --- Discover Page
 # =========================
+def discover_cards(items):
+    base = GOOGLE.get("redirect_uri", "http://localhost:8501")
+    render_cards(card_html(it["title"], f"{t('by')} {it['owner_name']} · {it['updated_at']}",
+                           href=f"{base}?share={it['id']}", label=t("view")) for it in items)
+
+def page_discover_search(q: str):
+    pages = st.session_state.setdefault("__search_pages", {})
+    n = pages.get(q, 1)
+    items = [it for p in range(n) for it in search_shares(q, p)]
+    if not items:
+        st.caption("—")
+        return
+    discover_cards(items)
+    if len(items) == n * SEARCH_PAGE and st.button(t("load_more"), key="__search_load_more", use_container_width=True):
+        pages[q] = n + 1
+        st.rerun()
+
 def page_discover():
     st.subheader(t("discover"))
-    items = discover_public(limit=100)
+    c1,c2 = st.columns([5,2])
+    with c1:
+        q = st.text_input(t("search"), key="__discover_q", placeholder=t("placeholder_search")).strip()
+    with c2:
+        sorts = {"recent": t("sort_recent"), "trending": t("sort_trending"), "liked": t("sort_liked")}
+        sort = st.selectbox(t("sort"), list(sorts), format_func=sorts.get, key="__discover_sort")
+    if q:
+        page_discover_search(q)
+        return
+    items, cursor = discover_first_page(sort)
     if not items:
         st.caption("—")
         return
-    for it in items:
-        st.markdown('<div class="item-card">', unsafe_allow_html=True)
-        c1,c2 = st.columns([6,2])
-        with c1:
-            st.write(f"**{it['title']}**")
-            st.caption(f"{t('by')} {it['owner_name']} · {it['updated_at']}")
-        with c2:
-            base = GOOGLE.get("redirect_uri", "http://localhost:8501")
-            url = f"{base}?share={it['id']}"
-            st.link_button(t("view"), url, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+    # 두 번째 페이지부터는 세션별로 이어 붙인다: {sort: {"rows": [...], "cursor": (정렬 키, id)}}
+    more = st.session_state.setdefault("__discover_more", {}).setdefault(sort, {"rows": [], "cursor": cursor})
+    if not more["rows"]: more["cursor"] = cursor
+    seen = {it["id"] for it in items}
+    items = items + [it for it in more["rows"] if it["id"] not in seen]
+    discover_cards(items)
+    if more["cursor"] and st.button(t("load_more"), key="__discover_load_more", use_container_width=True):
+        rows, more["cursor"] = discover_public(DISCOVER_PAGE, more["cursor"], sort)
+        more["rows"].extend(rows)
+        st.rerun()
+
+# =========================
+# --- Admin: hot-path timings
+# =========================
+def is_admin() -> bool:
+    user, admin = st.session_state.get("user"), APP.get("admin_email")
+    return bool(user and admin and user.get("email") == admin)
+
+def page_admin_metrics():
+    st.subheader(t("metrics"))
+    if not metrics.ENABLED:
+        st.info(t("metrics_off"))
+        return
+    rows = metrics.snapshot()
+    if rows:
+        import pandas as pd
+        st.dataframe(pd.DataFrame(rows).set_index("name"), use_container_width=True)
+    else:
+        st.caption("—")
+    c1,c2,c3 = st.columns(3)
+    with c1:
+        st.download_button("Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain", use_container_width=True)
+    with c2:
+        st.download_button("JSON", metrics.to_json(), file_name="metrics.json", mime="application/json", use_container_width=True)
+    with c3:
+        if st.button(t("reset"), use_container_width=True):
+            metrics.reset()
+            st.rerun()
 
 # =========================
 # --- Router
@@ -688,14 +1099,19 @@ def page_discover():
 # (필요하면 이전 코드와 결합 가능)
 
 # Query param: share=...
-params = st.experimental_get_query_params()
-if "share" in params:
-    page_share_view(params["share"][0])
+if "share" in st.query_params:
+    with metrics.span("render.share"):
+        page_share_view(st.query_params["share"])
 else:
-    tabs = st.tabs([f"📚 {t('my_list')}", f"🌏 {t('discover')}"])
-    with tabs[0]:
+    admin = is_admin()
+    tabs = st.tabs([f"📚 {t('my_list')}", f"🌏 {t('discover')}"] + ([f"⏱ {t('metrics')}"] if admin else []))
+    with tabs[0], metrics.span("render.my_list"):
         page_my_list()
-    with tabs[1]:
-        if time.time() - st.session_state["__discover_cache_at"] > 5:
-            st.session_state["__discover_cache_at"] = time.time()
-        page_discover()
\ No newline at end of file
+    with tabs[1], metrics.span("render.discover"):
+        page_discover()
+    if admin:
+        with tabs[2]:
+            page_admin_metrics()
+
+if metrics.ENABLED:   # 스크립트 한 번 전체 (st.rerun/st.stop 으로 끊긴 실행은 빠진다)
+    metrics.observe("rerun", (time.perf_counter() - RERUN_T0) * 1000)
@@ -0,0 +1,873 @@
+# storage.py
+# shares.db 데이터 계층 (Streamlit 비의존: 앱/워커/벤치에서 공용)
+import sqlite3, json, re, math, uuid, time, threading, queue
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# =========================
+# --- Schema / Migrations
+# =========================
+# PRAGMA user_version 으로 적용 단계를 기록한다. 항목은 append-only:
+# 이미 배포된 단계는 수정하지 말고 새 단계를 뒤에 추가할 것.
+def _m1_shares(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS shares (
+            id TEXT PRIMARY KEY,
+            owner_email TEXT,
+            owner_name TEXT,
+            title TEXT,
+            data_json TEXT,
+            is_public INTEGER DEFAULT 1,
+            created_at TEXT,
+            updated_at TEXT
+        )
+    """)
+
+def _m2_link_meta(conn):
+    # 링크 미리보기 캐시. 실패도 ok=0 으로 저장해 만료 전까지 재시도하지 않는다
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS link_meta (
+            url TEXT PRIMARY KEY,
+            image TEXT,
+            ok INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+
+def _m3_link_meta_fields(conn):
+    for col in ("title", "site_name", "description"):
+        conn.execute(f"ALTER TABLE link_meta ADD COLUMN {col} TEXT")
+
+def _m4_discover_index(conn):
+    # Discover 키셋 페이지네이션용: is_public=1 범위를 (updated_at, id) 역순으로 바로 탄다
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_shares_discover ON shares(is_public, updated_at DESC, id DESC)")
+
+def _m5_search(conn):
+    # 전문 검색. FTS rowid 는 search_map 으로 share id 와 연결 (shares 의 암시적 rowid 는 VACUUM 때 바뀔 수 있음)
+    conn.execute("CREATE TABLE IF NOT EXISTS search_map (rowid INTEGER PRIMARY KEY, share_id TEXT UNIQUE NOT NULL)")
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS shares_fts USING fts5(title, body)")
+    for sid, title, data_json in conn.execute("SELECT id, title, data_json FROM shares").fetchall():
+        _index_share(conn, sid, title, json.loads(data_json or "[]"))
+
+def _m6_share_items(conn):
+    # 항목을 (share_id, pos) 행으로 분리. 저장은 바뀐 행만, 조회는 필요한 만큼만.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS share_items (
+            share_id TEXT NOT NULL,
+            pos INTEGER NOT NULL,
+            title TEXT,
+            link TEXT,
+            note TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (share_id, pos)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("ALTER TABLE shares ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0")
+    for sid, data_json in conn.execute("SELECT id, data_json FROM shares WHERE data_json IS NOT NULL").fetchall():
+        items = json.loads(data_json or "[]")
+        conn.executemany(SQL_ITEM_UPSERT, [
+            (sid, pos, it.get("title",""), it.get("link",""), it.get("note",""), it.get("updated_at",""))
+            for pos, it in enumerate(items)
+        ])
+        conn.execute("UPDATE shares SET data_json=NULL, item_count=? WHERE id=?", (len(items), sid))
+
+def _m7_share_scores(conn):
+    # 트렌딩/좋아요순 정렬용 사전 계산 점수. trend 는 아래 trend_add 설명 참고
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS share_scores (
+            share_id TEXT PRIMARY KEY,
+            likes INTEGER NOT NULL DEFAULT 0,
+            views INTEGER NOT NULL DEFAULT 0,
+            comments INTEGER NOT NULL DEFAULT 0,
+            trend REAL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_trend ON share_scores(trend DESC, share_id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_likes ON share_scores(likes DESC, share_id DESC)")
+
+def _m8_user_items(conn):
+    # 개인 목록(내 웹툰)을 세션 메모리 대신 서버에 저장. owner 는 "u:이메일" 또는 익명 "a:쿠키id".
+    # 두 정렬 모두 인덱스 순서 그대로 페이지 단위로 읽는다 (title_key 는 파이썬 lower() 결과)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_items (
+            owner TEXT NOT NULL,
+            id TEXT NOT NULL,
+            title TEXT,
+            link TEXT,
+            note TEXT,
+            updated_at TEXT,
+            title_key TEXT,
+            PRIMARY KEY (owner, id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_items_recent ON user_items(owner, updated_at DESC, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_items_title ON user_items(owner, title_key, id)")
+
+def _m9_share_version(conn):
+    # 저장할 때마다 +1. 캐시 키이자 동시 편집 충돌 검사(조건부 UPDATE)용
+    conn.execute("ALTER TABLE shares ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+def _m10_link_jobs(conn):
+    # 링크 미리보기 조회 작업 큐. 공유 저장과 같은 트랜잭션에서 쌓이고 linkmeta 워커 프로세스가 처리한다
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS link_jobs (
+            url TEXT PRIMARY KEY,
+            domain TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_at REAL NOT NULL,
+            leased_until REAL NOT NULL DEFAULT 0,
+            last_error TEXT
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_link_jobs_run ON link_jobs(run_at)")
+
+def _m11_link_meta_thumb(conn):
+    # 워커가 받아서 줄여둔 썸네일의 thumbs.ThumbStore 키 (없으면 NULL -> 원격 이미지 사용)
+    conn.execute("ALTER TABLE link_meta ADD COLUMN thumb TEXT")
+
+def _m12_engagement(conn):
+    # 로컬 좋아요/조회수/댓글 (engagement.SQLiteEngagement). Supabase 쪽 테이블과 같은 모양
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS likes (
+            share_id TEXT NOT NULL,
+            email TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (share_id, email)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS share_counters (
+            share_id TEXT PRIMARY KEY,
+            views INTEGER NOT NULL DEFAULT 0,
+            sketch BLOB
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            share_id TEXT NOT NULL,
+            email TEXT,
+            name TEXT,
+            text TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_share ON comments(share_id, created_at DESC, id DESC)")
+
+def _m13_sessions(conn):
+    # 로그인 세션 (auth.sign 으로 서명한 쿠키의 id). 로그아웃은 행 삭제로 즉시 무효화
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            email TEXT NOT NULL,
+            name TEXT,
+            picture TEXT,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)")
+
+def _m14_user_items_link_key(conn):
+    # 중복 검사용 정규화 링크 (link_key). 제목 쪽은 기존 title_key 인덱스를 같이 쓴다
+    conn.execute("ALTER TABLE user_items ADD COLUMN link_key TEXT")
+    rows = conn.execute("SELECT owner, id, link FROM user_items WHERE link<>''").fetchall()
+    conn.executemany("UPDATE user_items SET link_key=? WHERE owner=? AND id=?", [(link_key(l), o, i) for o, i, l in rows])
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_items_link ON user_items(owner, link_key)")
+
+MIGRATIONS = [
+    _m1_shares,
+    _m2_link_meta,
+    _m3_link_meta_fields,
+    _m4_discover_index,
+    _m5_search,
+    _m6_share_items,
+    _m7_share_scores,
+    _m8_user_items,
+    _m9_share_version,
+    _m10_link_jobs,
+    _m11_link_meta_thumb,
+    _m12_engagement,
+    _m13_sessions,
+    _m14_user_items_link_key,
+]
+
+def migrate(conn):
+    # 여러 프로세스가 동시에 떠도 한 번만 적용되도록 쓰기 잠금 안에서 버전을 다시 읽는다
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ver = conn.execute("PRAGMA user_version").fetchone()[0]
+        for n, step in enumerate(MIGRATIONS[ver:], start=ver + 1):
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {n}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+# =========================
+# --- Connection Pool
+# =========================
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",     # WAL 에서는 NORMAL 로도 커밋 내구성 충분
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",       # 8MB
+    "PRAGMA mmap_size=67108864",     # 64MB
+    "PRAGMA foreign_keys=ON",
+)
+
+class Store:
+    """
+    프로세스 전역 SQLite 풀. 읽기는 커넥션 풀(WAL 이라 동시 읽기 가능),
+    쓰기는 전용 커넥션 하나 + 락으로 직렬화해서 SQLITE_BUSY 경합을 없앤다.
+    각 커넥션의 statement cache 가 준비된 구문을 재사용하므로 SQL 은 상수 문자열로 쓸 것.
+    """
+    def __init__(self, path: str, readers: int = 4):
+        self.path = path
+        self._writer = self._connect()
+        migrate(self._writer)
+        self._write_lock = threading.Lock()
+        self._readers = queue.LifoQueue()
+        for _ in range(readers):
+            self._readers.put(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False,
+                               isolation_level=None, cached_statements=256)
+        for p in PRAGMAS:
+            conn.execute(p)
+        conn.create_function("trend_add", 3, trend_add, deterministic=True)
+        return conn
+
+    @contextmanager
+    def read(self):
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def write(self):
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+# =========================
+# --- Shares
+# =========================
+SQL_SHARE_UPDATE = "UPDATE shares SET title=?, is_public=?, updated_at=?, item_count=?, version=version+1 WHERE id=?"
+SQL_SHARE_UPDATE_IF = SQL_SHARE_UPDATE + " AND version=?"
+SQL_SHARE_INSERT = """INSERT INTO shares(id, owner_email, owner_name, title, is_public, created_at, updated_at, item_count)
+                      VALUES (?,?,?,?,?,?,?,?)"""
+SQL_SHARE_GET = """SELECT id, owner_email, owner_name, title, is_public, created_at, updated_at, item_count, version
+                   FROM shares WHERE id=?"""
+SQL_SHARE_TITLE = "SELECT title, version FROM shares WHERE id=?"
+SQL_SHARE_VERSION = "SELECT version FROM shares WHERE id=?"
+SQL_ITEMS = """SELECT title, link, note, updated_at FROM share_items
+               WHERE share_id=? AND pos>=? ORDER BY pos LIMIT ?"""
+SQL_ITEMS_ALL = "SELECT pos, title, link, note, updated_at FROM share_items WHERE share_id=? ORDER BY pos"
+SQL_ITEM_UPSERT = """
+    INSERT INTO share_items(share_id, pos, title, link, note, updated_at) VALUES (?,?,?,?,?,?)
+    ON CONFLICT(share_id, pos) DO UPDATE SET title=excluded.title, link=excluded.link,
+        note=excluded.note, updated_at=excluded.updated_at
+"""
+SQL_ITEMS_TRUNCATE = "DELETE FROM share_items WHERE share_id=? AND pos>=?"
+# sort -> (첫 페이지, 커서 이후). 커서는 항상 (정렬 키, id), 정렬 키는 SELECT 의 5번째 열
+# 점수 정렬은 CROSS JOIN 으로 share_scores 인덱스를 바깥 루프에 고정해서 정렬 없이 LIMIT 만큼만 읽는다
+SQL_DISCOVER = {
+    "recent": ("""
+        SELECT id, owner_name, title, updated_at, updated_at
+        FROM shares WHERE is_public=1
+        ORDER BY updated_at DESC, id DESC
+        LIMIT ?
+    ""","""
+        SELECT id, owner_name, title, updated_at, updated_at
+        FROM shares WHERE is_public=1 AND (updated_at, id) < (?, ?)
+        ORDER BY updated_at DESC, id DESC
+        LIMIT ?
+    """),
+    "trending": ("""
+        SELECT s.id, s.owner_name, s.title, s.updated_at, sc.trend
+        FROM share_scores sc CROSS JOIN shares s ON s.id = sc.share_id
+        WHERE sc.trend IS NOT NULL AND s.is_public=1
+        ORDER BY sc.trend DESC, sc.share_id DESC
+        LIMIT ?
+    ""","""
+        SELECT s.id, s.owner_name, s.title, s.updated_at, sc.trend
+        FROM share_scores sc CROSS JOIN shares s ON s.id = sc.share_id
+        WHERE sc.trend IS NOT NULL AND s.is_public=1 AND (sc.trend, sc.share_id) < (?, ?)
+        ORDER BY sc.trend DESC, sc.share_id DESC
+        LIMIT ?
+    """),
+    "liked": ("""
+        SELECT s.id, s.owner_name, s.title, s.updated_at, sc.likes
+        FROM share_scores sc CROSS JOIN shares s ON s.id = sc.share_id
+        WHERE sc.likes > 0 AND s.is_public=1
+        ORDER BY sc.likes DESC, sc.share_id DESC
+        LIMIT ?
+    ""","""
+        SELECT s.id, s.owner_name, s.title, s.updated_at, sc.likes
+        FROM share_scores sc CROSS JOIN shares s ON s.id = sc.share_id
+        WHERE sc.likes > 0 AND s.is_public=1 AND (sc.likes, sc.share_id) < (?, ?)
+        ORDER BY sc.likes DESC, sc.share_id DESC
+        LIMIT ?
+    """),
+}
+
+def _save_items(conn, share_id, items):
+    """
+    저장된 행과 위치별로 비교해서 바뀐 항목만 upsert, 줄어든 꼬리만 delete.
+    메모 하나 고치면 행 하나만 쓴다. (변경 여부, 새로 쓴 행의 링크들) 반환.
+    """
+    old = {r[0]: r[1:] for r in conn.execute(SQL_ITEMS_ALL, (share_id,))}
+    rows = []
+    for pos, it in enumerate(items):
+        row = (it.get("title",""), it.get("link",""), it.get("note",""), it.get("updated_at",""))
+        if old.get(pos) != row:
+            rows.append((share_id, pos) + row)
+    if rows:
+        conn.executemany(SQL_ITEM_UPSERT, rows)
+    if len(old) > len(items):
+        conn.execute(SQL_ITEMS_TRUNCATE, (share_id, len(items)))
+    return bool(rows) or len(old) > len(items), {r[3] for r in rows if r[3]}
+
+class ShareConflict(Exception):
+    """조건부 저장 실패: 편집을 시작한 뒤 다른 사람이 먼저 저장했다. current 는 지금 DB 의 version."""
+    def __init__(self, share_id, expected, current):
+        super().__init__(f"share {share_id} is at version {current}, not {expected}")
+        self.share_id, self.expected, self.current = share_id, expected, current
+
+class ShareNotFound(KeyError):
+    """없는(지워진) 공유를 version 없이 저장하려 했다. 항목만 고아로 남지 않게 아무것도 쓰지 않는다."""
+
+def save_share(db: Store, share_id, owner_email, owner_name, title, items, is_public: bool, tnow: str, version=None):
+    """
+    새 공유면 만들고 id 를 돌려준다. 기존 공유는 version 을 주면 그 버전일 때만 고치고
+    (아니면 ShareConflict, 아무것도 쓰지 않음), 주지 않으면 무조건 덮어쓴다 (공유가 없으면 ShareNotFound).
+    """
+    with db.write() as conn:
+        if share_id:
+            old = conn.execute(SQL_SHARE_TITLE, (share_id,)).fetchone()
+            if version is None:
+                if conn.execute(SQL_SHARE_UPDATE, (title, 1 if is_public else 0, tnow, len(items), share_id)).rowcount == 0:
+                    raise ShareNotFound(share_id)
+            elif conn.execute(SQL_SHARE_UPDATE_IF,
+                              (title, 1 if is_public else 0, tnow, len(items), share_id, version)).rowcount == 0:
+                raise ShareConflict(share_id, version, old[1] if old else None)
+            changed, links = _save_items(conn, share_id, items)
+            changed = changed or not old or old[0] != title
+        else:
+            share_id = uuid.uuid4().hex[:12]
+            conn.execute(SQL_SHARE_INSERT,
+                        (share_id, owner_email, owner_name, title, 1 if is_public else 0, tnow, tnow, len(items)))
+            changed, links = True, _save_items(conn, share_id, items)[1]
+        if changed:
+            _index_share(conn, share_id, title, items)
+        _enqueue_links(conn, links, time.time())   # 저장이 커밋되면 작업도 같이 남는다
+    return share_id
+
+def load_items(db: Store, share_id, offset=0, limit=-1):
+    """항목을 pos 순서로 [offset, offset+limit) 만 읽는다 (limit=-1 이면 끝까지)."""
+    with db.read() as conn:
+        rows = conn.execute(SQL_ITEMS, (share_id, offset, limit)).fetchall()
+    return [{"title":r[0], "link":r[1], "note":r[2], "updated_at":r[3]} for r in rows]
+
+def _share_row(row, data):
+    return {
+        "id": row[0],
+        "owner_email": row[1],
+        "owner_name": row[2],
+        "title": row[3],
+        "data": data,
+        "is_public": bool(row[4]),
+        "created_at": row[5],
+        "updated_at": row[6],
+        "item_count": row[7],
+        "version": row[8],
+    }
+
+def load_share(db: Store, share_id, limit=-1):
+    """공유 메타 + 앞쪽 항목 limit 개(기본 전체). 전체 개수는 item_count."""
+    with db.read() as conn:
+        row = conn.execute(SQL_SHARE_GET, (share_id,)).fetchone()
+    if not row: return None
+    return _share_row(row, load_items(db, share_id, 0, limit))
+
+def share_version(db: Store, share_id):
+    with db.read() as conn:
+        row = conn.execute(SQL_SHARE_VERSION, (share_id,)).fetchone()
+    return row[0] if row else None
+
+class ShareCache:
+    """
+    디코딩된 공유(메타 + 항목)를 (id, version) 단위로 들고 있는 프로세스 전역 LRU.
+    조회 때는 기본키로 version 만 확인하고(recheck 초 안에 다시 보면 그것도 생략) 같으면 메모리에서 돌려준다.
+    다른 프로세스가 저장해도 version 이 바뀌므로 다음 확인 때 새로 읽는다. 반환값은 공유 객체이니 고치지 말 것.
+    메모리 상한은 공유 수가 아니라 들고 있는 항목 수(max_items)다. 항목이 max_share_items 개를 넘는 공유는
+    메타만 두고(data=None) 항목은 items() 가 부를 때마다 DB 에서 필요한 페이지만 읽는다.
+    """
+    def __init__(self, db: Store, max_items=50000, max_share_items=2000, recheck=1.0):
+        self.db = db
+        self.max_items = max_items
+        self.max_share_items = max_share_items
+        self.recheck = recheck
+        self._m = OrderedDict()     # share_id -> [checked_at, share]
+        self._size = 0              # 들고 있는 항목 수 (메타 하나는 1로 센다)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cost(share) -> int:
+        return 1 + len(share["data"] or ())
+
+    def _load(self, share_id):
+        # 메타와 항목을 한 스냅샷에서 읽어야 version 과 내용이 어긋나지 않는다
+        with self.db.read() as conn:
+            conn.execute("BEGIN")
+            try:
+                row = conn.execute(SQL_SHARE_GET, (share_id,)).fetchone()
+                small = row and row[7] <= self.max_share_items
+                rows = conn.execute(SQL_ITEMS, (share_id, 0, -1)).fetchall() if small else []
+            finally:
+                conn.execute("COMMIT")
+        if not row: return None
+        return _share_row(row, [{"title":r[0], "link":r[1], "note":r[2], "updated_at":r[3]} for r in rows] if small else None)
+
+    def _drop(self, share_id):
+        ent = self._m.pop(share_id, None)
+        if ent: self._size -= self._cost(ent[1])
+
+    def get(self, share_id):
+        """공유 메타 + 항목. 큰 공유는 data 가 None 이니 항목은 items() 로."""
+        now = time.monotonic()
+        with self._lock:
+            ent = self._m.get(share_id)
+            if ent and now - ent[0] < self.recheck:
+                self._m.move_to_end(share_id)
+                return ent[1]
+        ver = share_version(self.db, share_id)
+        if ent and ver == ent[1]["version"]:
+            ent[0] = now
+            return ent[1]
+        share = self._load(share_id) if ver is not None else None
+        with self._lock:
+            self._drop(share_id)
+            if share is None: return None
+            self._m[share_id] = [now, share]
+            self._size += self._cost(share)
+            while self._size > self.max_items and len(self._m) > 1:
+                self._drop(next(iter(self._m)))
+        return share
+
+    def items(self, share_id, offset=0, limit=-1):
+        share = self.get(share_id)
+        if not share: return []
+        data = share["data"]
+        if data is None: return load_items(self.db, share_id, offset, limit)
+        return data[offset:] if limit < 0 else data[offset:offset + limit]
+
+    def invalidate(self, share_id):
+        with self._lock:
+            self._drop(share_id)
+
+def discover_public(db: Store, limit=100, cursor=None, sort="recent"):
+    """
+    공개 공유 한 페이지. sort: recent(최신순) / trending / liked.
+    cursor 는 직전 페이지가 돌려준 (정렬 키, id). 반환: (rows, next_cursor) — 끝이면 None.
+    """
+    first, after = SQL_DISCOVER[sort]
+    with db.read() as conn:
+        if cursor:
+            rows = conn.execute(after, (cursor[0], cursor[1], limit + 1)).fetchall()
+        else:
+            rows = conn.execute(first, (limit + 1,)).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    nxt = (rows[-1][4], rows[-1][0]) if more else None
+    return [{"id":r[0], "owner_name":r[1], "title":r[2], "updated_at":r[3]} for r in rows], nxt
+
+# =========================
+# --- Trending scores
+# =========================
+# trend = log2( Σ w_i · 2^((t_i - EPOCH) / HALF_LIFE) )
+# 현재 시각의 감쇠 점수는 2^(trend - (now-EPOCH)/HALF_LIFE) 라서 trend 순서 = 지금의 트렌딩 순서.
+# 그래서 이벤트가 올 때 해당 행만 log 공간에서 더하면 되고 전체 재계산이 필요 없다.
+TREND_EPOCH = 1704067200.0          # 2024-01-01 UTC
+TREND_HALF_LIFE = 36 * 60 * 60.0
+TREND_WEIGHTS = {"view": 1.0, "like": 4.0, "comment": 6.0}
+
+def trend_add(cur, weight, ts):
+    """
+    log 공간 누적. weight 가 음수면(좋아요 취소) 그 좋아요를 준 시각 ts 의 가중치만큼 뺀다.
+    빼고 남는 게 없으면 NULL, 더한 적보다 많이 빼게 되면(시각이 어긋난 경우) 빼지 않고 그대로 둔다
+    - 조회/댓글 몫까지 날리지 않도록.
+    """
+    if not weight: return cur
+    x = (ts - TREND_EPOCH) / TREND_HALF_LIFE + math.log2(abs(weight))
+    if cur is None: return x if weight > 0 else None
+    m = max(cur, x)
+    v = 2.0 ** (cur - m) + math.copysign(2.0 ** (x - m), weight)
+    if v > 1e-9: return m + math.log2(v)
+    return None if v > -1e-9 else cur
+
+SQL_SCORE_EVENT = """
+    INSERT INTO share_scores(share_id, likes, views, comments, trend)
+    VALUES (?1, max(0, ?2), ?3, ?4, trend_add(NULL, ?5, ?6))
+    ON CONFLICT(share_id) DO UPDATE SET
+        likes = max(0, likes + ?2),
+        views = views + excluded.views,
+        comments = comments + excluded.comments,
+        trend = trend_add(trend, ?5, ?6)
+"""
+SQL_SCORE_SYNC = """
+    INSERT INTO share_scores(share_id, likes, views) VALUES (?,?,?)
+    ON CONFLICT(share_id) DO UPDATE SET likes=excluded.likes, views=excluded.views
+    WHERE likes <> excluded.likes OR views <> excluded.views
+"""
+
+def apply_score_events(db: Store, events):
+    """
+    events: [(share_id, kind, delta, ts)]  kind in TREND_WEIGHTS, delta 는 +1/-1.
+    ts 가 None 이면 개수만 바꾸고 trend 는 건드리지 않는다 (언제 준 건지 모르는 좋아요의 취소).
+    """
+    rows = []
+    for sid, kind, delta, ts in events:
+        rows.append((sid,
+                     delta if kind == "like" else 0,
+                     delta if kind == "view" else 0,
+                     delta if kind == "comment" else 0,
+                     TREND_WEIGHTS[kind] * delta if ts is not None else 0.0, ts or 0.0))
+    with db.write() as conn:
+        conn.executemany(SQL_SCORE_EVENT, rows)
+
+SQL_SCORE_REPLACE = "INSERT OR REPLACE INTO share_scores(share_id, likes, views, comments, trend) VALUES (?,?,?,?,?)"
+SQL_SHARE_IDS = "SELECT id FROM shares ORDER BY id"
+
+def trend_of(events):
+    """[(kind, ts)] 를 처음부터 접은 trend (이벤트가 없으면 None)."""
+    cur = None
+    for kind, ts in events:
+        cur = trend_add(cur, TREND_WEIGHTS[kind], ts)
+    return cur
+
+def replace_scores(db: Store, rows):
+    """백필용: rows=[(share_id, likes, views, comments, trend)] 로 행을 통째로 덮어쓴다."""
+    with db.write() as conn:
+        conn.executemany(SQL_SCORE_REPLACE, rows)
+
+def share_ids(db: Store) -> list:
+    with db.read() as conn:
+        return [r[0] for r in conn.execute(SQL_SHARE_IDS)]
+
+def sync_score_counts(db: Store, rows):
+    """백엔드의 정확한 카운트로 likes/views 를 맞춘다. rows: [(share_id, likes, views)]"""
+    with db.write() as conn:
+        conn.executemany(SQL_SCORE_SYNC, rows)
+
+# =========================
+# --- Search (FTS5)
+# =========================
+# 한국어는 2음절 단어가 흔해서 FTS5 trigram 토크나이저로는 "웹툰" 같은 검색이 안 된다.
+# 그래서 단어를 겹치는 2-gram 으로 잘라 저장하고, 검색어도 같은 2-gram 의 구(phrase)로 바꾼다.
+# (unicode61 토크나이저는 공백으로 나뉜 2-gram 을 그대로 토큰으로 쓴다)
+_WORD_RE = re.compile(r"[^\W_]+")
+
+SQL_SEARCH_MAP = """
+    INSERT INTO search_map(share_id) VALUES (?)
+    ON CONFLICT(share_id) DO UPDATE SET share_id=excluded.share_id
+    RETURNING rowid
+"""
+SQL_SEARCH_DELETE = "DELETE FROM shares_fts WHERE rowid=?"
+SQL_SEARCH_INSERT = "INSERT INTO shares_fts(rowid, title, body) VALUES (?,?,?)"
+SQL_SEARCH = """
+    SELECT s.id, s.owner_name, s.title, s.updated_at
+    FROM shares_fts f
+    JOIN search_map m ON m.rowid = f.rowid
+    JOIN shares s ON s.id = m.share_id
+    WHERE shares_fts MATCH ? AND s.is_public=1
+    ORDER BY bm25(shares_fts, 5.0, 1.0)
+    LIMIT ? OFFSET ?
+"""
+
+def ngrams(text: str) -> str:
+    out = []
+    for w in _WORD_RE.findall((text or "").lower()):
+        if len(w) <= 2: out.append(w)
+        else: out.extend(w[i:i+2] for i in range(len(w) - 1))
+    return " ".join(out)
+
+def match_query(q: str) -> str:
+    """검색어 -> FTS5 MATCH 식. 단어마다 2-gram 구, 단어끼리는 AND. 한 글자는 접두 검색."""
+    parts = []
+    for w in _WORD_RE.findall((q or "").lower()):
+        parts.append(f'"{w}"*' if len(w) == 1 else f'"{ngrams(w)}"')
+    return " AND ".join(parts)
+
+def _index_share(conn, share_id, title, items):
+    rid = conn.execute(SQL_SEARCH_MAP, (share_id,)).fetchone()[0]
+    body = "\n".join(f"{it.get('title','')} {it.get('note','')}" for it in items)
+    conn.execute(SQL_SEARCH_DELETE, (rid,))
+    conn.execute(SQL_SEARCH_INSERT, (rid, ngrams(title), ngrams(body)))
+
+def _reindex_all(conn):
+    conn.execute("DELETE FROM shares_fts")
+    for sid, title in conn.execute("SELECT id, title FROM shares").fetchall():
+        items = [{"title": r[1], "note": r[3]} for r in conn.execute(SQL_ITEMS_ALL, (sid,))]
+        _index_share(conn, sid, title, items)
+
+def search_public(db: Store, q: str, limit=20, offset=0):
+    """공개 공유 검색 (bm25, 제목 가중치 5배). 검색어에 단어가 없으면 빈 목록."""
+    expr = match_query(q)
+    if not expr: return []
+    with db.read() as conn:
+        rows = conn.execute(SQL_SEARCH, (expr, limit, offset)).fetchall()
+    return [{"id":r[0], "owner_name":r[1], "title":r[2], "updated_at":r[3]} for r in rows]
+
+def rebuild_search(db: Store):
+    """기존 DB 의 검색 색인을 처음부터 다시 만든다."""
+    with db.write() as conn:
+        _reindex_all(conn)
+        conn.execute("INSERT INTO shares_fts(shares_fts) VALUES ('optimize')")
+
+# =========================
+# --- Personal lists
+# =========================
+_USER_ITEM_COLS = "id, title, link, note, updated_at"
+SQL_USER_ITEMS = {
+    "recent": f"SELECT {_USER_ITEM_COLS} FROM user_items WHERE owner=? ORDER BY updated_at DESC, id LIMIT ? OFFSET ?",
+    "az": f"SELECT {_USER_ITEM_COLS} FROM user_items WHERE owner=? ORDER BY title_key, id LIMIT ? OFFSET ?",
+}
+SQL_USER_ITEM_COUNT = "SELECT count(*) FROM user_items WHERE owner=?"
+SQL_USER_ITEM_PUT = """
+    INSERT INTO user_items(owner, id, title, link, note, updated_at, title_key, link_key) VALUES (?,?,?,?,?,?,?,?)
+    ON CONFLICT(owner, id) DO UPDATE SET title=excluded.title, link=excluded.link, note=excluded.note,
+        updated_at=excluded.updated_at, title_key=excluded.title_key, link_key=excluded.link_key
+"""
+SQL_USER_ITEM_DELETE = "DELETE FROM user_items WHERE owner=? AND id=?"
+SQL_USER_DUP_LINKS = "SELECT DISTINCT link_key FROM user_items WHERE owner=? AND link_key IN (SELECT value FROM json_each(?))"
+SQL_USER_DUP_TITLES = "SELECT DISTINCT title_key FROM user_items WHERE owner=? AND title_key IN (SELECT value FROM json_each(?))"
+SQL_USER_ITEMS_CLAIM = "UPDATE OR IGNORE user_items SET owner=? WHERE owner=?"
+
+def count_user_items(db: Store, owner) -> int:
+    with db.read() as conn:
+        return conn.execute(SQL_USER_ITEM_COUNT, (owner,)).fetchone()[0]
+
+def load_user_items(db: Store, owner, sort="recent", offset=0, limit=-1):
+    """정렬 순서로 [offset, offset+limit) 만 읽는다 (limit=-1 이면 끝까지)."""
+    with db.read() as conn:
+        rows = conn.execute(SQL_USER_ITEMS[sort], (owner, limit, offset)).fetchall()
+    return [{"id":r[0], "title":r[1], "link":r[2], "note":r[3], "updated_at":r[4]} for r in rows]
+
+def link_key(url) -> str:
+    """중복 판정용 링크: 스킴/www./m./끝 슬래시/프래그먼트/utm_* 를 버리고 쿼리는 정렬."""
+    url = (url or "").strip()
+    if not url: return ""
+    p = urlsplit(url if "://" in url else "http://" + url)
+    host = (p.hostname or "").lower()
+    for pre in ("www.", "m."):
+        if host.startswith(pre): host = host[len(pre):]
+    query = "&".join(sorted(q for q in p.query.split("&") if q and not q.startswith("utm_")))
+    return host + p.path.rstrip("/") + ("?" + query if query else "")
+
+def title_key(title) -> str:
+    return (title or "").strip().lower()
+
+def user_duplicates(db: Store, owner, items) -> list:
+    """
+    items 각각이 owner 목록에 이미 있는지 (정규화 링크가 같거나, 링크 없이 제목이 같으면 중복).
+    items 안에서 서로 겹치는 것도 뒤엣것을 중복으로 본다. 인덱스 조회 두 번.
+    """
+    lks = [link_key(it.get("link")) for it in items]
+    tks = [title_key(it.get("title")) for it in items]
+    with db.read() as conn:
+        have_l = {r[0] for r in conn.execute(SQL_USER_DUP_LINKS, (owner, json.dumps([k for k in lks if k])))}
+        have_t = {r[0] for r in conn.execute(SQL_USER_DUP_TITLES, (owner, json.dumps([k for k, l in zip(tks, lks) if k and not l])))}
+    out = []
+    for lk, tk in zip(lks, tks):
+        dup = lk in have_l if lk else (bool(tk) and tk in have_t)
+        out.append(dup)
+        if lk: have_l.add(lk)
+        elif tk: have_t.add(tk)
+    return out
+
+def iter_user_items(db: Store, owner, sort="recent", batch=500):
+    """내보내기용: 개인 목록 전체를 batch 개씩 읽어 하나씩 내준다 (읽기 연결은 배치 사이에 돌려준다)."""
+    offset = 0
+    while True:
+        rows = load_user_items(db, owner, sort, offset, batch)
+        yield from rows
+        if len(rows) < batch: return
+        offset += batch
+
+def iter_share_items(db: Store, share_id, batch=500):
+    offset = 0
+    while True:
+        rows = load_items(db, share_id, offset, batch)
+        yield from rows
+        if len(rows) < batch: return
+        offset += batch
+
+def apply_user_ops(db: Store, ops):
+    """ops: [(owner, item_id, item 또는 None)] - None 이면 삭제. 한 트랜잭션으로 반영."""
+    puts = [(o, i, it.get("title",""), it.get("link",""), it.get("note",""), it.get("updated_at",""),
+             title_key(it.get("title")), link_key(it.get("link"))) for o, i, it in ops if it is not None]
+    dels = [(o, i) for o, i, it in ops if it is None]
+    with db.write() as conn:
+        if puts: conn.executemany(SQL_USER_ITEM_PUT, puts)
+        if dels: conn.executemany(SQL_USER_ITEM_DELETE, dels)
+
+def claim_user_items(db: Store, src, dst):
+    """익명으로 쌓은 목록을 로그인한 계정으로 옮긴다."""
+    with db.write() as conn:
+        conn.execute(SQL_USER_ITEMS_CLAIM, (dst, src))
+        conn.execute("DELETE FROM user_items WHERE owner=?", (src,))
+
+# =========================
+# --- Login sessions
+# =========================
+SQL_SESSION_GET = "SELECT email, name, picture FROM sessions WHERE id=? AND expires_at > ?"
+SQL_SESSION_PUT = "INSERT INTO sessions(id, email, name, picture, created_at, expires_at) VALUES (?,?,?,?,?,?)"
+SQL_SESSION_DELETE = "DELETE FROM sessions WHERE id=?"
+SQL_SESSION_PURGE = "DELETE FROM sessions WHERE expires_at <= ?"
+
+def create_session(db: Store, session_id, user: dict, now: float, ttl: float):
+    with db.write() as conn:
+        conn.execute(SQL_SESSION_PURGE, (now,))
+        conn.execute(SQL_SESSION_PUT, (session_id, user["email"], user.get("name"), user.get("picture"), now, now + ttl))
+
+def get_session(db: Store, session_id, now: float):
+    """살아 있는 세션이면 {"email","name","picture"}, 아니면 None."""
+    with db.read() as conn:
+        row = conn.execute(SQL_SESSION_GET, (session_id, now)).fetchone()
+    return {"email": row[0], "name": row[1] or "", "picture": row[2]} if row else None
+
+def delete_session(db: Store, session_id):
+    with db.write() as conn:
+        conn.execute(SQL_SESSION_DELETE, (session_id,))
+
+# =========================
+# --- Link metadata cache
+# =========================
+# IN (...) 대신 json_each 로 받아서 URL 개수와 무관하게 같은 준비 구문을 재사용
+SQL_LINK_META_GET = """
+    SELECT url, image, title, site_name, description, ok, thumb FROM link_meta
+    WHERE url IN (SELECT value FROM json_each(?)) AND expires_at > ?
+"""
+SQL_LINK_META_PUT = """
+    INSERT INTO link_meta(url, image, title, site_name, description, ok, fetched_at, expires_at, thumb)
+    VALUES (?,?,?,?,?,?,?,?,?)
+    ON CONFLICT(url) DO UPDATE SET image=excluded.image, title=excluded.title,
+        site_name=excluded.site_name, description=excluded.description, ok=excluded.ok,
+        fetched_at=excluded.fetched_at, expires_at=excluded.expires_at, thumb=excluded.thumb
+"""
+
+def get_link_meta(db: Store, urls, now: float) -> dict:
+    """만료되지 않은 캐시만 {url: {"image","title","site_name","description","ok","thumb"}} 로 반환."""
+    with db.read() as conn:
+        rows = conn.execute(SQL_LINK_META_GET, (json.dumps(list(urls)), now)).fetchall()
+    return {r[0]: {"image": r[1] or "", "title": r[2] or "", "site_name": r[3] or "",
+                   "description": r[4] or "", "ok": bool(r[5]), "thumb": r[6] or ""} for r in rows}
+
+def put_link_meta(db: Store, rows):
+    """rows: [(url, image, title, site_name, description, ok, fetched_at, expires_at, thumb)]"""
+    with db.write() as conn:
+        conn.executemany(SQL_LINK_META_PUT, rows)
+
+# =========================
+# --- Link metadata jobs
+# =========================
+# 이미 유효한 캐시가 있거나 큐에 있는 URL 은 다시 넣지 않는다
+SQL_LINK_JOB_ENQUEUE = """
+    INSERT INTO link_jobs(url, domain, run_at)
+    SELECT ?1, ?2, ?3 WHERE NOT EXISTS (SELECT 1 FROM link_meta WHERE url=?1 AND expires_at > ?3)
+    ON CONFLICT(url) DO NOTHING
+"""
+SQL_LINK_JOBS_DUE = """
+    SELECT url, domain, attempts FROM link_jobs
+    WHERE run_at <= ?1 AND leased_until <= ?1 AND domain NOT IN (SELECT value FROM json_each(?2))
+    ORDER BY run_at LIMIT ?3
+"""
+SQL_LINK_JOB_LEASE = "UPDATE link_jobs SET leased_until=? WHERE url=?"
+SQL_LINK_JOB_DONE = "DELETE FROM link_jobs WHERE url=?"
+SQL_LINK_JOB_RETRY = "UPDATE link_jobs SET attempts=attempts+1, run_at=?, leased_until=0, last_error=? WHERE url=?"
+SQL_LINK_JOBS_ALL_ITEMS = "SELECT DISTINCT link FROM share_items WHERE link <> ''"
+# 아직 어떤 공유에 남아 있는 링크 중 캐시가 만료된 것 (지워진 링크는 다시 가져오지 않는다).
+# share_items 를 한 번 훑으면서 link_meta 는 기본키로 찾는다
+SQL_LINK_META_EXPIRED = """
+    SELECT DISTINCT i.link FROM share_items i JOIN link_meta m ON m.url = i.link
+    WHERE i.link <> '' AND m.expires_at <= ?
+"""
+
+def _enqueue_links(conn, urls, now):
+    rows = [(u, urlsplit(u).hostname or "", now) for u in urls if u.startswith(("http://", "https://"))]
+    if rows: conn.executemany(SQL_LINK_JOB_ENQUEUE, rows)
+
+def enqueue_link_jobs(db: Store, urls, now: float):
+    with db.write() as conn:
+        _enqueue_links(conn, urls, now)
+
+def enqueue_expired_links(db: Store, now: float) -> int:
+    """캐시가 만료된 링크를 다시 큐에 넣는다 (워커가 주기적으로). 넣은 후보 수를 돌려준다."""
+    with db.read() as conn:
+        urls = [r[0] for r in conn.execute(SQL_LINK_META_EXPIRED, (now,))]
+    if urls: enqueue_link_jobs(db, urls, now)
+    return len(urls)
+
+def claim_link_jobs(db: Store, now: float, limit: int, lease: float, busy_domains=()):
+    """
+    실행할 때가 된 작업을 도메인당 하나씩 최대 limit 개 가져와 lease 초 동안 선점한다.
+    워커가 죽으면 선점이 풀려서 다른 워커가 다시 가져간다. [(url, domain, attempts)]
+    """
+    with db.write() as conn:
+        picked, seen = [], set(busy_domains)
+        for url, domain, attempts in conn.execute(SQL_LINK_JOBS_DUE, (now, json.dumps(list(seen)), limit * 4)).fetchall():
+            if domain in seen: continue
+            seen.add(domain)
+            picked.append((url, domain, attempts))
+            if len(picked) >= limit: break
+        conn.executemany(SQL_LINK_JOB_LEASE, [(now + lease, p[0]) for p in picked])
+    return picked
+
+def finish_link_job(db: Store, url, meta_row):
+    """meta_row: put_link_meta 의 한 행. 결과 저장과 작업 삭제를 한 트랜잭션으로."""
+    with db.write() as conn:
+        conn.execute(SQL_LINK_META_PUT, meta_row)
+        conn.execute(SQL_LINK_JOB_DONE, (url,))
+
+def retry_link_job(db: Store, url, run_at: float, error: str):
+    with db.write() as conn:
+        conn.execute(SQL_LINK_JOB_RETRY, (run_at, error, url))
+
+# =========================
+# --- CLI
+# =========================
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="shares.db 관리")
+    ap.add_argument("--db", default="shares.db")
+    ap.add_argument("command", choices=["migrate", "reindex-search", "enqueue-links"])
+    args = ap.parse_args()
+    store = Store(args.db, readers=1)   # 생성 시 마이그레이션 적용
+    if args.command == "reindex-search":
+        rebuild_search(store)
+    elif args.command == "enqueue-links":   # 큐 도입 전에 저장된 공유의 링크를 한 번에 채운다
+        with store.read() as conn:
+            urls = [r[0] for r in conn.execute(SQL_LINK_JOBS_ALL_ITEMS)]
+        enqueue_link_jobs(store, urls, time.time())
+    store.close()
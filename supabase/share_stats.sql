@@ -0,0 +1,31 @@
+-- 공유 페이지 통계를 한 번의 왕복으로 반환 (engagement.SupabaseEngagement.share_stats)
+-- p_add_view = true 면 조회 1건을 기록한 뒤 집계한다.
+-- Supabase SQL Editor 에서 실행.
+
+create or replace function public.share_stats(
+    p_share_id text,
+    p_email text default null,
+    p_add_view boolean default false
+)
+returns table (like_count bigint, view_count bigint, liked boolean)
+language plpgsql
+security invoker
+as $$
+begin
+    if p_add_view then
+        insert into public.views(share_id) values (p_share_id);
+    end if;
+    return query
+    select
+        (select count(*) from public.likes l where l.share_id = p_share_id),
+        (select count(*) from public.views v where v.share_id = p_share_id),
+        (p_email is not null and exists(
+            select 1 from public.likes l where l.share_id = p_share_id and l.email = p_email));
+end;
+$$;
+
+grant execute on function public.share_stats(text, text, boolean) to anon, authenticated;
+
+-- count(*) 가 인덱스만 타도록
+create index if not exists likes_share_id_idx on public.likes(share_id, email);
+create index if not exists views_share_id_idx on public.views(share_id);
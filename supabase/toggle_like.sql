@@ -0,0 +1,31 @@
+-- 좋아요 토글을 한 번의 왕복으로: 있으면 지우고 없으면 넣은 뒤 (liked, like_count) 반환
+-- (engagement.SupabaseEngagement.toggle_like)
+
+-- 중복 좋아요 정리 후 유니크 제약
+delete from public.likes a using public.likes b
+where a.ctid < b.ctid and a.share_id = b.share_id and a.email = b.email;
+alter table public.likes drop constraint if exists likes_share_email_key;
+alter table public.likes add constraint likes_share_email_key unique (share_id, email);
+
+create or replace function public.toggle_like(p_share_id text, p_email text)
+returns table (liked boolean, like_count bigint)
+language plpgsql
+security invoker
+as $$
+declare
+    v_liked boolean;
+begin
+    delete from public.likes l where l.share_id = p_share_id and l.email = p_email;
+    if found then
+        v_liked := false;
+    else
+        insert into public.likes(share_id, email) values (p_share_id, p_email)
+        on conflict (share_id, email) do nothing;
+        v_liked := true;
+    end if;
+    return query
+    select v_liked, (select count(*) from public.likes l where l.share_id = p_share_id);
+end;
+$$;
+
+grant execute on function public.toggle_like(text, text) to anon, authenticated;
@@ -0,0 +1,87 @@
+-- 공유별 고유 방문자 HyperLogLog 스케치 (hll.py 와 같은 포맷: 2048 바이트 레지스터)
+-- 각 앱 레플리카가 배치마다 델타 스케치를 보내고, 서버는 레지스터별 max 로 병합한다.
+-- view_counters.sql 다음에 실행.
+
+create table if not exists public.share_viewers (
+    share_id text primary key,
+    sketch bytea not null,
+    updated_at timestamptz not null default now()
+);
+
+create or replace function public.hll_merge(a bytea, b bytea)
+returns bytea
+language plpgsql
+immutable
+as $$
+declare
+    r bytea := a;
+    i int;
+begin
+    if a is null then return b; end if;
+    if b is null or length(a) <> length(b) then return a; end if;
+    for i in 0 .. length(a) - 1 loop
+        if get_byte(b, i) > get_byte(r, i) then
+            r := set_byte(r, i, get_byte(b, i));
+        end if;
+    end loop;
+    return r;
+end;
+$$;
+
+-- record_views 에 p_sketches({"share_id": "<hex>"}) 추가
+drop function if exists public.record_views(jsonb);
+create or replace function public.record_views(p_events jsonb, p_sketches jsonb default '{}'::jsonb)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.views(share_id, created_at)
+    select e->>'share_id', coalesce((e->>'at')::timestamptz, now())
+    from jsonb_array_elements(p_events) e;
+
+    insert into public.share_counters as c (share_id, views, updated_at)
+    select e->>'share_id', count(*), now()
+    from jsonb_array_elements(p_events) e
+    group by e->>'share_id'
+    on conflict (share_id) do update
+        set views = c.views + excluded.views, updated_at = now();
+
+    insert into public.share_viewers as v (share_id, sketch, updated_at)
+    select key, decode(value, 'hex'), now()
+    from jsonb_each_text(p_sketches)
+    on conflict (share_id) do update
+        set sketch = public.hll_merge(v.sketch, excluded.sketch), updated_at = now();
+end;
+$$;
+
+grant execute on function public.record_views(jsonb, jsonb) to anon, authenticated;
+grant select on public.share_viewers to anon, authenticated;
+
+-- share_stats 가 스케치도 함께 반환 (반환 타입이 바뀌므로 drop 후 재생성)
+drop function if exists public.share_stats(text, text, boolean);
+create or replace function public.share_stats(
+    p_share_id text,
+    p_email text default null,
+    p_add_view boolean default false
+)
+returns table (like_count bigint, view_count bigint, liked boolean, viewer_sketch bytea)
+language plpgsql
+security invoker
+as $$
+begin
+    if p_add_view then
+        perform public.record_views(jsonb_build_array(jsonb_build_object('share_id', p_share_id)));
+    end if;
+    return query
+    select
+        (select count(*) from public.likes l where l.share_id = p_share_id),
+        coalesce((select c.views from public.share_counters c where c.share_id = p_share_id), 0),
+        (p_email is not null and exists(
+            select 1 from public.likes l where l.share_id = p_share_id and l.email = p_email)),
+        (select s.sketch from public.share_viewers s where s.share_id = p_share_id);
+end;
+$$;
+
+grant execute on function public.share_stats(text, text, boolean) to anon, authenticated;
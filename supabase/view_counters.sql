@@ -0,0 +1,61 @@
+-- 조회 이벤트 배치 기록 + 공유별 집계 카운터 (engagement.ViewBuffer -> SupabaseEngagement.record_views)
+-- 조회수는 더 이상 views 를 count(*) 하지 않고 share_counters.views 를 읽는다.
+-- share_stats.sql 다음에 실행.
+
+create table if not exists public.share_counters (
+    share_id text primary key,
+    views bigint not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+-- 기존 views 로 카운터 초기화 (한 번)
+insert into public.share_counters(share_id, views)
+select share_id, count(*) from public.views group by share_id
+on conflict (share_id) do nothing;
+
+-- p_events: [{"share_id": "...", "at": "2024-01-01T00:00:00+00:00"}, ...]
+create or replace function public.record_views(p_events jsonb)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.views(share_id, created_at)
+    select e->>'share_id', coalesce((e->>'at')::timestamptz, now())
+    from jsonb_array_elements(p_events) e;
+
+    insert into public.share_counters as c (share_id, views, updated_at)
+    select e->>'share_id', count(*), now()
+    from jsonb_array_elements(p_events) e
+    group by e->>'share_id'
+    on conflict (share_id) do update
+        set views = c.views + excluded.views, updated_at = now();
+end;
+$$;
+
+grant execute on function public.record_views(jsonb) to anon, authenticated;
+grant select on public.share_counters to anon, authenticated;
+
+-- share_stats: 조회수를 카운터에서 읽도록 교체
+create or replace function public.share_stats(
+    p_share_id text,
+    p_email text default null,
+    p_add_view boolean default false
+)
+returns table (like_count bigint, view_count bigint, liked boolean)
+language plpgsql
+security invoker
+as $$
+begin
+    if p_add_view then
+        perform public.record_views(jsonb_build_array(jsonb_build_object('share_id', p_share_id)));
+    end if;
+    return query
+    select
+        (select count(*) from public.likes l where l.share_id = p_share_id),
+        coalesce((select c.views from public.share_counters c where c.share_id = p_share_id), 0),
+        (p_email is not null and exists(
+            select 1 from public.likes l where l.share_id = p_share_id and l.email = p_email));
+end;
+$$;
@@ -0,0 +1,3 @@
+# Streamlit 비의존 모듈(storage, engagement, listio ...)만 테스트한다. 저장소 루트를 import 경로에.
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
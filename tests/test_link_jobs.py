@@ -0,0 +1,33 @@
+import time
+import pytest
+import storage, linkmeta
+
+@pytest.fixture
+def db(tmp_path):
+    store = storage.Store(str(tmp_path / "t.db"), readers=1)
+    yield store
+    store.close()
+
+def jobs(db):
+    with db.read() as conn:
+        return sorted(r[0] for r in conn.execute("SELECT url FROM link_jobs"))
+
+def meta_row(url, expires_at):
+    return (url, "https://img/" + url[-1], "", "", "", 1, 0.0, expires_at, "")
+
+def test_save_enqueues_and_render_only_reads(db):
+    storage.save_share(db, None, "o@example.com", "o", "s", [{"title": "a", "link": "https://x/a"}], True, "2025-01-01T00:00:00")
+    assert jobs(db) == ["https://x/a"]
+    with db.write() as conn:
+        conn.execute("DELETE FROM link_jobs")
+    assert linkmeta.cached_images(db, ["https://x/a", "https://x/new"]) == {}
+    assert jobs(db) == []
+
+def test_expired_links_are_requeued_only_while_shared(db):
+    now = time.time()
+    storage.save_share(db, None, "o@example.com", "o", "s", [{"title": "a", "link": "https://x/a"}], True, "2025-01-01T00:00:00")
+    with db.write() as conn:
+        conn.execute("DELETE FROM link_jobs")
+    storage.put_link_meta(db, [meta_row("https://x/a", now - 1), meta_row("https://x/gone", now - 1)])
+    assert storage.enqueue_expired_links(db, now) == 1
+    assert jobs(db) == ["https://x/a"]
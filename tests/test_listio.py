@@ -0,0 +1,59 @@
+import io, csv, json
+import pytest
+import listio
+
+def items(data: str, name: str):
+    return list(listio.iter_items(io.BytesIO(data.encode()), name))
+
+@pytest.fixture(params=[7, listio.CHUNK])
+def chunk(request, monkeypatch):
+    # 작은 청크로도 돌려서 요소가 청크 경계에 걸리는 경우를 본다
+    monkeypatch.setattr(listio, "CHUNK", request.param)
+
+def test_csv_long_cell_is_clipped():
+    limit = csv.field_size_limit()
+    out = items("title,link\n" + "가" * 20000 + ",https://a.com\n", "a.csv")
+    assert len(out[0]["title"]) == listio.MAX_FIELD and out[0]["link"] == "https://a.com"
+    assert csv.field_size_limit() == limit   # 전역 한도는 건드리지 않는다
+
+def test_csv_cell_over_module_limit_is_format_error():
+    with pytest.raises(listio.FormatError):
+        items("title\n" + "x" * (csv.field_size_limit() + 1) + "\n", "a.csv")
+
+def test_csv_without_header_and_aliases():
+    assert items("신의 탑,https://a.com,\n\n", "a.csv") == [{"title": "신의 탑", "link": "https://a.com", "note": ""}]
+    assert items("제목,URL,메모\nA,b.com,n\n", "a.csv") == [{"title": "A", "link": "b.com", "note": "n"}]
+
+def test_json_array_and_lines(chunk):
+    rows = [{"title": f"웹툰 {i}", "url": f"https://a.com/{i}", "memo": 'n,"q"'} for i in range(30)]
+    arr = items(json.dumps(rows, ensure_ascii=False), "a.json")
+    lines = items("\n".join(json.dumps(r) for r in rows) + "\n", "a.jsonl")
+    assert arr == lines and len(arr) == 30 and arr[3] == {"title": "웹툰 3", "link": "https://a.com/3", "note": 'n,"q"'}
+    assert items(" [ ] ", "a.json") == []
+
+@pytest.mark.parametrize("data", [
+    '[{"title":"a"}',             # 닫히지 않은 배열
+    '[{"title":"a"},',
+    '[{"title":"a"} {"title":"b"}]',
+    '{"title":"a"} 5',            # JSON Lines 뒤 찌꺼기
+    '{"title":"a"}\nnope',
+    '[{"title":"a"}] x',          # 배열 뒤 찌꺼기
+    '[] {}',
+    '[1, 2]',
+    'nope',
+])
+def test_json_malformed_is_format_error(data, chunk):
+    with pytest.raises(listio.FormatError):
+        items(data, "a.json")
+
+def test_unknown_extension():
+    with pytest.raises(listio.FormatError):
+        listio.iter_items(io.BytesIO(b""), "a.xlsx")
+
+@pytest.mark.parametrize("fmt", ["csv", "json"])
+def test_export_round_trip(tmp_path, fmt):
+    rows = [{"title": f"t{i}", "link": f"https://a.com/{i}", "note": "a,\"b\"\nc", "updated_at": "2025-01-01"} for i in range(5)]
+    path = listio.export_file(iter(rows), fmt, str(tmp_path))
+    with open(path, "rb") as f:
+        back = list(listio.iter_items(f, path))
+    assert back == [{k: r[k] for k in listio.FIELDS} for r in rows]
@@ -0,0 +1,12 @@
+import metrics
+
+def test_prometheus_families_are_contiguous():
+    metrics.reset()
+    metrics.observe("a", 1.0)
+    metrics.observe('b"x', 2.0, error=True)
+    lines = metrics.to_prometheus("t").splitlines()
+    fams = [l.split("{")[0].split(" ")[0] if not l.startswith("#") else l.split()[2] for l in lines]
+    fams = ["t_span_seconds" if f.startswith("t_span_seconds") else f for f in fams]
+    seen = [f for i, f in enumerate(fams) if i == 0 or fams[i - 1] != f]
+    assert seen == ["t_span_seconds", "t_span_errors_total"]
+    assert 't_span_errors_total{name="b\\"x"} 1' in lines
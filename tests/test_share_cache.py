@@ -0,0 +1,39 @@
+import pytest
+import storage
+
+@pytest.fixture
+def db(tmp_path):
+    store = storage.Store(str(tmp_path / "t.db"), readers=1)
+    yield store
+    store.close()
+
+def share(db, n):
+    items = [{"title": f"t{i}", "link": "", "note": "", "updated_at": ""} for i in range(n)]
+    return storage.save_share(db, None, "o@example.com", "o", f"s{n}", items, True, "2025-01-01T00:00:00")
+
+def test_big_share_is_paged_from_db(db):
+    sid = share(db, 50)
+    cache = storage.ShareCache(db, max_items=1000, max_share_items=10)
+    assert cache.get(sid)["data"] is None and cache._size == 1
+    assert [it["title"] for it in cache.items(sid, 20, 3)] == ["t20", "t21", "t22"]
+    assert len(cache.items(sid)) == 50
+
+def test_cache_is_capped_by_items(db):
+    ids = [share(db, 8) for _ in range(5)]
+    cache = storage.ShareCache(db, max_items=30, max_share_items=10)
+    for sid in ids: cache.get(sid)
+    assert cache._size <= 30 and list(cache._m) == ids[-3:]
+    assert [it["title"] for it in cache.items(ids[0], 7)] == ["t7"]   # 밀려난 것도 다시 읽힌다
+
+def test_new_version_replaces_entry(db):
+    sid = share(db, 3)
+    cache = storage.ShareCache(db, recheck=0)
+    cache.get(sid)
+    storage.save_share(db, sid, "o@example.com", "o", "s", [{"title": "new"}], True, "2025-01-02T00:00:00")
+    assert [it["title"] for it in cache.items(sid)] == ["new"] and cache._size == 2
+
+def test_unconditional_save_of_missing_share_writes_nothing(db):
+    with pytest.raises(storage.ShareNotFound):
+        storage.save_share(db, "nope", "o@example.com", "o", "s", [{"title": "x"}], True, "2025-01-02T00:00:00")
+    with db.read() as conn:
+        assert conn.execute("SELECT count(*) FROM share_items WHERE share_id='nope'").fetchone()[0] == 0
@@ -0,0 +1,78 @@
+import time
+import pytest
+import storage, engagement
+
+HOUR, DAY = 3600.0, 86400.0
+
+@pytest.fixture
+def db(tmp_path):
+    store = storage.Store(str(tmp_path / "t.db"), readers=1)
+    yield store
+    store.close()
+
+def trend(db, sid):
+    with db.read() as conn:
+        return conn.execute("SELECT likes, trend FROM share_scores WHERE share_id=?", (sid,)).fetchone()
+
+def views_only(now):
+    t = None
+    for h in (1, 2, 3):
+        t = storage.trend_add(t, storage.TREND_WEIGHTS["view"], now - h * HOUR)
+    return t
+
+def test_unlike_at_like_time_removes_only_the_like():
+    now = time.time()
+    base = views_only(now)
+    liked = storage.trend_add(base, storage.TREND_WEIGHTS["like"], now - 7 * DAY)
+    assert storage.trend_add(liked, -storage.TREND_WEIGHTS["like"], now - 7 * DAY) == pytest.approx(base)
+
+def test_overshooting_unlike_keeps_score():
+    # 일주일 전 좋아요를 '지금' 가중치로 빼면 더한 것보다 많이 빠진다 -> NULL 이 아니라 그대로
+    now = time.time()
+    liked = storage.trend_add(views_only(now), storage.TREND_WEIGHTS["like"], now - 7 * DAY)
+    assert storage.trend_add(liked, -storage.TREND_WEIGHTS["like"], now) == liked
+
+def test_unlike_of_only_event_clears_trend():
+    now = time.time()
+    liked = storage.trend_add(None, storage.TREND_WEIGHTS["like"], now - 2 * DAY)
+    assert storage.trend_add(liked, -storage.TREND_WEIGHTS["like"], now - 2 * DAY) is None
+
+def test_unlike_of_old_like_only_changes_count(db):
+    now = time.time()
+    storage.apply_score_events(db, [("s", "like", 1, now - 7 * DAY)] + [("s", "view", 1, now - h * HOUR) for h in (1, 2, 3)])
+    _, before = trend(db, "s")
+    keeper = engagement.ScoreKeeper(db, flush_every=3600)
+    keeper.like("s", "a@example.com", False)   # 이 프로세스가 본 적 없는 좋아요
+    keeper.flush()
+    likes, after = trend(db, "s")
+    assert likes == 0 and after == pytest.approx(before)
+
+def test_like_then_unlike_cancels(db):
+    now = time.time()
+    storage.apply_score_events(db, [("s", "view", 1, now - h * HOUR) for h in (1, 2, 3)])
+    _, base = trend(db, "s")
+    keeper = engagement.ScoreKeeper(db, flush_every=3600)
+    keeper.like("s", "a@example.com", True)
+    keeper.flush()
+    keeper.like("s", "a@example.com", False)
+    keeper.flush()
+    likes, after = trend(db, "s")
+    assert likes == 0 and after == pytest.approx(base)
+
+def test_backfill_scores_from_sqlite_backend(db):
+    now = time.time()
+    eng = engagement.SQLiteEngagement(db)
+    sid = storage.save_share(db, None, "o@example.com", "o", "s", [{"title": "a"}], True, "2025-01-01T00:00:00")
+    quiet = storage.save_share(db, None, "o@example.com", "o", "q", [{"title": "b"}], True, "2025-01-01T00:00:00")
+    iso = lambda ts: engagement.datetime.fromtimestamp(ts, engagement.timezone.utc).isoformat()
+    with db.write() as conn:
+        conn.execute(eng.SQL_LIKE_INSERT, (sid, "a@example.com", iso(now - DAY)))
+        conn.execute(eng.SQL_LIKE_INSERT, (sid, "b@example.com", iso(now - 2 * DAY)))
+        conn.execute(eng.SQL_COMMENT_INSERT, (sid, None, None, "hi", iso(now - HOUR)))
+    eng.record_views([{"share_id": sid}] * 3)
+    assert engagement.backfill_scores(db, eng, now) == 2
+    with db.read() as conn:
+        got = conn.execute("SELECT likes, views, comments, trend FROM share_scores WHERE share_id=?", (sid,)).fetchone()
+        assert conn.execute("SELECT likes, trend FROM share_scores WHERE share_id=?", (quiet,)).fetchone() == (0, None)
+    want = storage.trend_of([("like", now - DAY), ("like", now - 2 * DAY), ("comment", now - HOUR)])
+    assert got[:3] == (2, 3, 1) and got[3] == pytest.approx(want)
@@ -0,0 +1,39 @@
+import glob
+import engagement
+
+def lines(path):
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+def buffer(base, sink=None, **kw):
+    return engagement.ViewBuffer(sink or (lambda evs: None), spool_path=str(base), flush_every=3600, **kw)
+
+def test_each_process_keeps_its_own_spool(tmp_path):
+    sent = []
+    a, b = buffer(tmp_path / "views.spool", sent.extend), buffer(tmp_path / "views.spool")
+    a.add("s1"); b.add("s2"); b.add("s2")
+    assert a.spool_path != b.spool_path
+    assert a.flush() and [e["share_id"] for e in sent] == ["s1"]
+    assert lines(a.spool_path) == 0 and lines(b.spool_path) == 2 and b.pending("s2") == 2
+
+def test_dead_process_spool_is_replayed(tmp_path):
+    dead = buffer(tmp_path / "views.spool")
+    dead.add("s1"); dead.add("s2")
+    dead._spool.close()   # 프로세스가 죽으면 잠금이 풀린다
+    sent = []
+    live = buffer(tmp_path / "views.spool", sent.extend)
+    assert live.pending("s1") == 1 and live.flush()
+    assert sorted(e["share_id"] for e in sent) == ["s1", "s2"]
+    assert glob.glob(str(tmp_path / "views.spool.*")) == [live.spool_path]
+
+def test_spool_stays_bounded(tmp_path):
+    fails = [True]
+    def sink(evs):
+        if fails[0]: raise OSError
+    vb = buffer(tmp_path / "views.spool", sink, batch=10, max_pending=50)
+    for i in range(200): vb.add(f"s{i % 3}")
+    assert not vb.flush() and len(vb._events) == 50
+    fails[0] = False
+    assert vb.flush() and lines(vb.spool_path) == 40
+    while vb._events: vb.flush()
+    assert lines(vb.spool_path) == 0 and vb.pending("s0") == 0
@@ -0,0 +1,83 @@
+# thumbs.py
+# 썸네일 축소본 디스크 캐시. 원본 이미지 바이트의 해시로 주소를 매겨 같은 표지는 한 벌만 두고,
+# 전체 용량이 상한을 넘으면 오래 안 쓴 것(mtime)부터 지운다. 쓰기/정리는 linkmeta 워커, 읽기는 앱.
+import os, io, time, hashlib
+try:
+    from PIL import Image
+except ImportError:   # Pillow 가 없으면 축소본 없이 원격 이미지 URL 을 그대로 쓴다
+    Image = None
+
+# Streamlit 은 app/static/ 을 실행한 디렉터리가 아니라 스크립트(project.py) 옆 static/ 에서 내준다
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "thumbs")
+WIDTHS = (100, 200)                 # 화면 100px, 고해상도 화면용 200px
+MAX_SOURCE_BYTES = 8*1024*1024      # 이보다 큰 원본은 받지 않는다
+MAX_CACHE_BYTES = 512*1024*1024
+TOUCH_EVERY = 60*60                 # 읽을 때마다 utime 하지 않도록 이 간격으로만 LRU 시각 갱신
+
+class ThumbStore:
+    def __init__(self, root: str = ROOT, max_bytes: int = MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None
+
+    def _path(self, key: str, width: int) -> str:
+        return os.path.join(self.root, key[:2], f"{key}_{width}.webp")
+
+    def put(self, data: bytes) -> str:
+        """원본 이미지를 WIDTHS 크기로 줄여 저장하고 키를 돌려준다. 이미지가 아니면 ValueError."""
+        key = hashlib.sha256(data).hexdigest()[:32]
+        todo = [w for w in WIDTHS if not os.path.exists(self._path(key, w))]
+        if not todo: return key
+        try:
+            img = Image.open(io.BytesIO(data))
+            img.draft("RGB", (max(todo), max(todo) * 4))   # JPEG 는 디코딩 단계에서 미리 줄인다
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        except Exception as e:
+            raise ValueError(f"not an image: {e}") from e
+        os.makedirs(os.path.dirname(self._path(key, todo[0])), exist_ok=True)
+        for w in todo:
+            out = img.copy()
+            out.thumbnail((w, w * 4))
+            path = self._path(key, w)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            out.save(tmp, "WEBP", quality=80, method=4)
+            os.replace(tmp, path)   # 앱이 반쯤 쓴 파일을 읽지 않도록
+        return key
+
+    def path(self, key: str, width: int = WIDTHS[-1]) -> str:
+        """축소본 파일 경로. 없으면 (지워졌으면) ""."""
+        if not key: return ""
+        p = self._path(key, width)
+        try:
+            if time.time() - os.stat(p).st_mtime > TOUCH_EVERY:
+                os.utime(p)
+        except OSError:
+            return ""
+        return p
+
+    def evict(self) -> int:
+        """용량 상한의 90% 아래로 내려갈 때까지 오래된 파일부터 지운다. 지운 파일 수 반환."""
+        files, total = [], 0
+        for d, _, names in os.walk(self.root):
+            for n in names:
+                p = os.path.join(d, n)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+        if total <= self.max_bytes: return 0
+        removed = 0
+        for _, size, p in sorted(files):
+            if total <= self.max_bytes * 0.9: break
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,49 @@
+# userlist.py
+# 개인 목록(storage.user_items) 쓰기 버퍼. 세션은 보이는 페이지만 들고 있고 편집은 여기로 모인다.
+import time, threading
+import storage
+
+class ListWriter:
+    """
+    (owner, item_id) 별 마지막 변경만 남겨(같은 항목을 여러 번 고치면 한 번만 씀) 모았다가
+    flush_every 초마다 한 트랜잭션으로 반영한다. 읽기 전에는 flush(owner) 로 그 사용자 몫만 먼저 내려서
+    자기가 쓴 내용은 항상 보이게 한다.
+    """
+    def __init__(self, db, flush_every=3.0):
+        self.db = db
+        self.flush_every = flush_every
+        self._ops = {}          # (owner, item_id) -> item dict 또는 None(삭제)
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="list-writer", daemon=True).start()
+
+    def put(self, owner: str, item: dict):
+        with self._lock:
+            self._ops[(owner, item["id"])] = dict(item)
+
+    def delete(self, owner: str, item_id: str):
+        with self._lock:
+            self._ops[(owner, item_id)] = None
+
+    def pending(self, owner: str) -> bool:
+        with self._lock:
+            return any(k[0] == owner for k in self._ops)
+
+    def flush(self, owner: str = None):
+        with self._lock:
+            if owner is None:
+                taken, self._ops = self._ops, {}
+            else:
+                taken = {k: v for k, v in self._ops.items() if k[0] == owner}
+                for k in taken: del self._ops[k]
+        if not taken: return
+        try:
+            storage.apply_user_ops(self.db, [(o, i, it) for (o, i), it in taken.items()])
+        except Exception:
+            with self._lock:   # 그 사이 더 새 변경이 들어왔으면 그쪽이 우선
+                for k, v in taken.items(): self._ops.setdefault(k, v)
+            if owner is not None: raise
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_every)
+            self.flush()